@@ -1,6 +1,17 @@
 from .house import House
-from .robot import VacuumRobot
-from .controller import Controller
+from .robot import VacuumRobot, Pose
+from .sensors import WallSensor, Lidar
+from .controller import Controller, State, WallState
 from .button import Button
 from .dust import Dust
-from .wall import Wall
+from .simulation import Simulation
+from .renderer import Renderer
+from .hud import Hud
+from .profiler import FrameProfiler, Phase
+from .trajectory import TrajectoryRecorder, Trajectory
+from .map_file import save_map, load_map, load_tiles
+from .tiles import BitTiles
+from .coverage import Coverage
+from .planner import Plan, get_plan
+from .seeker import DustField, get_dust_field
+from .vector_env import VectorEnv, OBSERVATIONS
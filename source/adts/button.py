@@ -50,6 +50,11 @@ class Button:
 
         self.rect.move_ip(x - self.rect.topleft[0], y - self.rect.topleft[1])
 
+    def get_rect(self) -> pygame.Rect:
+        """Getter for the rectangle"""
+
+        return self.rect
+
     def get_height(self) -> int:
         """Getter for rectangle height"""
 
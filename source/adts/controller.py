@@ -1,36 +1,124 @@
+import math
+from enum import IntEnum
+
 import numpy as np
 import pygame
 
 from .robot import VacuumRobot
 
 
+class State(IntEnum):
+    """Motion states of the controller (the values are the ones recorded)"""
+
+    WALKING = 0
+    ROTATING = 1
+
+
+class WallState(IntEnum):
+    """Wall following states of the controller (the values are the ones recorded)"""
+
+    LOOKING = 0
+    FOLLOWING = 1
+    CONTORNING = 2
+
+
+def get_vector(linear_velocity: float, angular_velocity: float) -> np.array:
+    """Returns read-only controls"""
+
+    controls = np.array([linear_velocity, angular_velocity], dtype=float)
+    controls.flags.writeable = False
+
+    return controls
+
+
 class Controller:
-    """Controls the robot"""
+    """Controls the robot
+
+    The controls of each action are allocated once and the wall follower is a table
+    of transitions by state, so getting the controls doesn't allocate arrays
+    """
+
+    __slots__ = (
+        "mode",
+        "automatic",
+        "planned",
+        "seeking",
+        "linear_velocity",
+        "angular_velocity",
+        "frequency",
+        "rotate_percent",
+        "state",
+        "wall_state",
+        "start_angle",
+        "start_pos",
+        "collided",
+        "rotating_timer",
+        "elapsed",
+        "waypoints",
+        "waypoint",
+        "max_heading_error",
+        "walking",
+        "turning",
+        "stopped",
+        "manual_controls",
+        "steering",
+        "controls",
+        "motors",
+    )
 
     def __init__(
-        self, linear_velocity: float, angular_velocity: float, mode: str, frequency: int
+        self,
+        linear_velocity: float,
+        angular_velocity: float,
+        mode: str,
+        frequency: int,
+        rotate_percent: float = 0.01,
     ) -> None:
+        self.mode = mode
         self.automatic = mode == "automatic"
-        self.default = np.array([linear_velocity, angular_velocity])
+        self.planned = mode in ("planned", "seek")  # Following waypoints
+        self.seeking = mode == "seek"  # Waypoints to the closest dust
+        self.linear_velocity = float(linear_velocity)
+        self.angular_velocity = float(angular_velocity)
         self.frequency = frequency
+        self.rotate_percent = rotate_percent  # Rotation after a collision (of pi)
 
-        self.state = "walking"  # Current state from : walking, rotating
-        self.wall_state = (
-            "looking"  # Current wall state from: following, contorning, looking
-        )
+        self.state = State.WALKING
+        self.wall_state = WallState.LOOKING
         self.start_angle = None  # Start angle when contorning a wall
-        self.start_pos = None  # Start pos when contorning a wall
+        self.start_pos = None  # Start pos (x, y) when contorning a wall
         self.collided = False  # If collided before
 
-        self.rotating_timer = None  # Timer for rotating
-        self.n_frames = 0  # Counter to use in timer
+        self.rotating_timer = None  # Seconds to rotate for (None if not timed)
+        self.elapsed = 0.0  # Seconds since the timer started
+
+        self.waypoints = []  # Positions (x, y) to go through in planned mode
+        self.waypoint = 0  # Index of the next one
+        self.max_heading_error = 0.05  # Rad, turning in place while bigger
+
+        # Controls of each action (by rotation direction when turning)
+        v, w = self.linear_velocity, self.angular_velocity
+        self.walking = get_vector(v, 0)
+        self.turning = {1: get_vector(0, w), -1: get_vector(0, -w)}
+        self.stopped = get_vector(0, 0)
+        self.manual_controls = (
+            (pygame.K_w, self.walking),
+            (pygame.K_a, self.turning[1]),
+            (pygame.K_s, get_vector(-v, 0)),
+            (pygame.K_d, self.turning[-1]),
+            (pygame.K_RETURN, self.stopped),
+        )
+        self.steering = np.zeros(2)  # Controls towards the next waypoint
 
         # Set current controls and vacuum motors
         if self.automatic:
-            self.controls = np.array([linear_velocity, 0])
+            self.controls = self.walking
+            self.motors = True
+        elif self.planned:
+            self.controls = self.stopped
             self.motors = True
         else:
-            self.controls = np.array([0, 0])
+            self.controls = self.stopped
             self.motors = False
 
     def get_controls(
@@ -38,109 +126,196 @@ class Controller:
     ) -> np.array:
         """Get current controls"""
 
-        x, y, theta = robot.get_state()
+        pose = robot.pose
+        x, y, theta = pose.x, pose.y, pose.theta
 
-        if self.automatic:
+        if self.planned:
+            self.follow_plan(x, y, theta)
 
-            match self.wall_state:
-                case "following":
-                    match self.state:
-                        case "walking":
-                            # Is walking but lost track of the wall
-                            if not back_lidar and not front_lidar:
-                                self.set_controls("rotating", direction=-1, timer=False)
-                                self.wall_state = "contorning"
-                                self.start_angle = theta
-
-                case "contorning":
-                    match self.state:
-                        case "walking":
-                            # Found the wall
-                            if back_lidar and front_lidar:
-                                self.wall_state = "following"
-                            # Avoid infinite walking forward (limit)
-                            elif (
-                                self.start_pos is not None
-                                and np.linalg.norm(np.array([x, y]) - self.start_pos)
-                                > 2 * robot.get_radius()
-                            ):
-                                self.start_pos = None
-                                self.set_controls("rotating", direction=-1, timer=False)
-                                self.start_angle = theta
-                        case "rotating":
-
-                            # Stop rotating when the limit was reached or the front lidar found the wall
-                            if (
-                                not self.collided
-                                and self.start_angle is not None
-                                and (
-                                    front_lidar
-                                    or np.abs(theta - self.start_angle) > np.pi / 2
-                                )
-                            ):
-                                self.start_angle = None
-                                self.set_controls("walking")
-                                self.start_pos = np.array([x, y])
-
-                case "looking":
-                    # Found wall
-                    if back_lidar and front_lidar:
-                        self.wall_state = "following"
+        elif self.automatic:
+            transition = self.TRANSITIONS[self.wall_state][self.state]
+            if transition is not None:
+                transition(self, back_lidar, front_lidar, x, y, theta, robot)
 
             # Rotating timer expired
-            if self.rotating_timer is not None and self.n_frames >= max(
-                self.rotating_timer, 1
-            ):
-                self.set_controls("walking")
+            if self.rotating_timer is not None and self.elapsed >= self.rotating_timer:
+                self.set_controls(State.WALKING)
 
+            # The controller runs once per simulation step
             if self.rotating_timer is not None:
-                self.n_frames += 1
+                self.elapsed += 1 / self.frequency
 
             self.collided = False
 
         else:
-            if keys[pygame.K_w]:
-                self.controls = np.array([self.default[0], 0])
-            elif keys[pygame.K_a]:
-                self.controls = np.array([0, self.default[1]])
-            elif keys[pygame.K_s]:
-                self.controls = np.array([-self.default[0], 0])
-            elif keys[pygame.K_d]:
-                self.controls = np.array([0, -self.default[1]])
-            elif keys[pygame.K_RETURN]:
-                self.controls = np.array([0, 0])
+            for key, controls in self.manual_controls:
+                if keys[key]:
+                    self.controls = controls
+                    break
 
             self.motors = keys[pygame.K_SPACE]
 
         return self.controls, self.motors
 
+    def look_for_wall(
+        self,
+        back_lidar: bool,
+        front_lidar: bool,
+        x: float,
+        y: float,
+        theta: float,
+        robot: VacuumRobot,
+    ) -> None:
+        """Follows the first wall found"""
+
+        if back_lidar and front_lidar:
+            self.wall_state = WallState.FOLLOWING
+
+    def follow_wall(
+        self,
+        back_lidar: bool,
+        front_lidar: bool,
+        x: float,
+        y: float,
+        theta: float,
+        robot: VacuumRobot,
+    ) -> None:
+        """Turns around the wall when walking lost track of it"""
+
+        if not back_lidar and not front_lidar:
+            self.set_controls(State.ROTATING, direction=-1, timer=False)
+            self.wall_state = WallState.CONTORNING
+            self.start_angle = theta
+
+    def contorn_walking(
+        self,
+        back_lidar: bool,
+        front_lidar: bool,
+        x: float,
+        y: float,
+        theta: float,
+        robot: VacuumRobot,
+    ) -> None:
+        """Follows the wall again when found, turning more if it walked too far"""
+
+        # Found the wall
+        if back_lidar and front_lidar:
+            self.wall_state = WallState.FOLLOWING
+
+        # Avoid infinite walking forward (limit)
+        elif (
+            self.start_pos is not None
+            and math.hypot(x - self.start_pos[0], y - self.start_pos[1])
+            > 2 * robot.get_radius()
+        ):
+            self.start_pos = None
+            self.set_controls(State.ROTATING, direction=-1, timer=False)
+            self.start_angle = theta
+
+    def contorn_rotating(
+        self,
+        back_lidar: bool,
+        front_lidar: bool,
+        x: float,
+        y: float,
+        theta: float,
+        robot: VacuumRobot,
+    ) -> None:
+        """Walks again when the front lidar found the wall or it turned a quarter"""
+
+        if (
+            not self.collided
+            and self.start_angle is not None
+            and (front_lidar or abs(theta - self.start_angle) > math.pi / 2)
+        ):
+            self.start_angle = None
+            self.set_controls(State.WALKING)
+            self.start_pos = (x, y)
+
+    # Transitions of the wall follower by wall state and state (None keeps them)
+    TRANSITIONS = (
+        (look_for_wall, look_for_wall),  # Looking
+        (follow_wall, None),  # Following
+        (contorn_walking, contorn_rotating),  # Contorning
+    )
+
     def collide(self) -> None:
         """Changes control after colision"""
 
-        if self.automatic:
+        if self.planned:
+            # Give up on the waypoint that couldn't be reached
+            self.waypoint += 1
+
+        elif self.automatic:
             self.collided = True
             if self.rotating_timer is None:
-                self.set_controls("rotating", direction=1)
+                self.set_controls(State.ROTATING, direction=1)
 
-    def get_timer_in_frames(self, rotate_percent: float) -> int:
-        """Returns a timer in frames"""
+    def get_timer(self, rotate_percent: float) -> float:
+        """Returns the seconds to rotate `rotate_percent` of pi"""
 
-        return round(self.frequency * rotate_percent * np.pi / self.default[1])
+        return rotate_percent * math.pi / self.angular_velocity
 
-    def set_controls(self, action: str, direction: int = None, timer=True) -> None:
+    def set_controls(self, action: State, direction: int = None, timer=True) -> None:
         """Sets the current controls"""
 
-        if action == "walking":
-            self.controls = np.array([self.default[0], 0])
+        if action == State.WALKING:
+            self.controls = self.walking
             self.motors = True
             self.rotating_timer = None
 
-        elif action == "rotating":
-            self.controls = np.array([0, direction * self.default[1]])
+        elif action == State.ROTATING:
+            self.controls = self.turning[direction]
             self.motors = False
-            self.rotating_timer = (
-                self.get_timer_in_frames(rotate_percent=0.01) if timer else None
-            )
+            self.rotating_timer = self.get_timer(self.rotate_percent) if timer else None
 
         self.state = action
-        self.n_frames = 0
+        self.elapsed = 0.0
+
+    def set_waypoints(self, waypoints: np.array) -> None:
+        """Sets the positions (x, y) to go through in planned mode"""
+
+        self.waypoints = [tuple(p) for p in np.asarray(waypoints).tolist()]
+        self.waypoint = 0
+
+    def stop_seeking(self) -> None:
+        """Follows the walls once the waypoints left are reached"""
+
+        self.seeking = False
+
+    def follow_plan(self, x: float, y: float, theta: float) -> None:
+        """Turns towards the next waypoint and walks to it
+
+        When there are no more, the dust left is looked for following walls (when
+        seeking, it waits for the way to the next dust instead)
+        """
+
+        # Waypoints already reached
+        while self.waypoint < len(self.waypoints):
+            target_x, target_y = self.waypoints[self.waypoint]
+            distance = math.hypot(target_x - x, target_y - y)
+            if distance >= 0.5:
+                break
+            self.waypoint += 1
+        else:
+            if self.seeking:
+                self.controls = self.stopped
+                return
+
+            self.planned = False
+            self.automatic = True
+            self.set_controls(State.WALKING)
+            return
+
+        heading = math.atan2(y - target_y, target_x - x)  # The y axis points down
+        error = (heading - theta + math.pi) % (2 * math.pi) - math.pi
+
+        w = self.angular_velocity
+        self.steering[1] = min(max(error * self.frequency, -w), w)
+        if abs(error) > self.max_heading_error:
+            self.steering[0] = 0
+            self.state = State.ROTATING
+        else:
+            self.steering[0] = min(self.linear_velocity, distance * self.frequency)
+            self.state = State.WALKING
+        self.controls = self.steering
@@ -0,0 +1,113 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from .tiles import get_overlaps
+
+
+@lru_cache(maxsize=None)
+def get_disc_masks(radius: float, phases: int = 4) -> np.array:
+    """Cells inside a disc of `radius`, for each sub-pixel position of its center
+
+    Has shape (`phases`, `phases`, size, size), indexed by the y and x fractions of
+    the center, which is `size` // 2 cells from the top left corner
+    """
+
+    half = int(np.ceil(radius)) + 1
+    cells = np.arange(-half, half + 1)
+    fractions = np.arange(phases) / phases
+
+    dy = cells[None, :, None] - fractions[:, None, None]
+    dx = cells[None, None, :] - fractions[:, None, None]
+    masks = dy[:, None, :, :] ** 2 + dx[None, :, :, :] ** 2 <= radius**2
+
+    masks.flags.writeable = False
+    return masks
+
+
+def get_footprint(
+    x0: float, y0: float, x1: float, y1: float, radius: float, phases: int = 4
+) -> tuple:
+    """Cells covered by a disc of `radius` moving from (`x0`, `y0`) to (`x1`, `y1`)
+
+    Returns the left and top of the region and its mask. Discs are stamped every
+    `radius` / 5 along the way, with their centers rounded to 1 / `phases` of a cell,
+    so only cells within a fifth of a cell from the edge can be wrong
+    """
+
+    masks = get_disc_masks(radius, phases)
+    size = masks.shape[-1]
+
+    # Centers in 1 / `phases` of a cell
+    n = int(math.hypot(x1 - x0, y1 - y0) * 5 / radius) + 1
+    xs = [round((x0 + (x1 - x0) * i / n) * phases) for i in range(n + 1)]
+    ys = [round((y0 + (y1 - y0) * i / n) * phases) for i in range(n + 1)]
+    left, top = min(xs) // phases, min(ys) // phases
+
+    mask = np.zeros(
+        (max(ys) // phases - top + size, max(xs) // phases - left + size), dtype=bool
+    )
+    for x, y in dict.fromkeys(zip(xs, ys)):  # Without repeated centers
+        (x, px), (y, py) = divmod(x, phases), divmod(y, phases)
+        mask[y - top : y - top + size, x - left : x - left + size] |= masks[py, px]
+
+    return left - size // 2, top - size // 2, mask
+
+
+class Coverage:
+    """Times each cell was under the robot (up to 255), in tiles only allocated once
+    visited"""
+
+    def __init__(self, width: int, height: int, tile_size: int = 256) -> None:
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tiles = {}  # (row, column) -> visits
+        self.n_covered = 0  # Cells visited at least once
+
+    def add(self, left: int, top: int, mask: np.array) -> int:
+        """Visits the cells of `mask` (starting at `left`, `top`), returns the new ones"""
+
+        size = self.tile_size
+        bottom, right = top + mask.shape[0], left + mask.shape[1]
+
+        new = 0
+        for row, column, inside, part in get_overlaps(
+            left, top, right, bottom, self.width, self.height, size
+        ):
+            tile = self.tiles.get((row, column))
+            if tile is None:
+                tile = np.zeros((size, size), dtype=np.uint8)
+                self.tiles[(row, column)] = tile
+
+            visits, visited = tile[part], mask[inside]
+
+            # Counts that wrapped around are kept at 255
+            before = np.count_nonzero(visits)
+            np.add(visits, visited, out=visits, casting="unsafe")
+            visits -= (visits == 0) & visited
+            new += np.count_nonzero(visits) - before
+
+        self.n_covered += new
+        return new
+
+    def get_array(self, left: int, top: int, right: int, bottom: int) -> np.array:
+        """Visits of a region (right and bottom excluded), 0 outside the house"""
+
+        region = np.zeros((bottom - top, right - left), dtype=np.uint8)
+
+        for row, column, inside, part in get_overlaps(
+            left, top, right, bottom, self.width, self.height, self.tile_size
+        ):
+            tile = self.tiles.get((row, column))
+            if tile is not None:
+                region[inside] = tile[part]
+
+        return region
+
+    def reset(self) -> None:
+        """Forgets all the visits"""
+
+        self.tiles = {}
+        self.n_covered = 0
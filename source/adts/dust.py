@@ -21,3 +21,61 @@ class Dust(pygame.sprite.Sprite):
         """Getter for position"""
 
         return self.pos
+
+
+class DustMap:
+    """Dust spots indexed by a uniform grid of buckets (spatial hash)"""
+
+    def __init__(self, cell_size: int = 32) -> None:
+        self.cell_size = cell_size
+        self.buckets = {}  # Cell -> dust spots (x, y) inside it
+        self.count = 0
+
+    def add(self, x: int, y: int) -> None:
+        """Puts dust in that spot"""
+
+        bucket = self.buckets.setdefault(
+            (x // self.cell_size, y // self.cell_size), set()
+        )
+        if (x, y) not in bucket:
+            bucket.add((x, y))
+            self.count += 1
+
+    def remove(self, x: int, y: int) -> None:
+        """Removes the dust from that spot"""
+
+        bucket = self.buckets.get((x // self.cell_size, y // self.cell_size))
+        if bucket is not None and (x, y) in bucket:
+            bucket.remove((x, y))
+            self.count -= 1
+            if not bucket:
+                del self.buckets[(x // self.cell_size, y // self.cell_size)]
+
+    def find(self, left: int, top: int, right: int, bottom: int) -> list[tuple]:
+        """Returns the dust spots inside the rectangle (`right` and `bottom` excluded)"""
+
+        found = []
+        for cx in range(left // self.cell_size, (right - 1) // self.cell_size + 1):
+            for cy in range(top // self.cell_size, (bottom - 1) // self.cell_size + 1):
+                for x, y in self.buckets.get((cx, cy), ()):
+                    if left <= x < right and top <= y < bottom:
+                        found.append((x, y))
+
+        return found
+
+    def __contains__(self, spot: tuple) -> bool:
+        """Checks if there is dust in that spot"""
+
+        x, y = spot
+        return spot in self.buckets.get((x // self.cell_size, y // self.cell_size), ())
+
+    def __iter__(self):
+        """Iterates over the dust spots"""
+
+        for bucket in self.buckets.values():
+            yield from bucket
+
+    def __len__(self) -> int:
+        """Number of dust spots"""
+
+        return self.count
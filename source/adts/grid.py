@@ -0,0 +1,134 @@
+import numpy as np
+
+
+def distance_transform(grid: np.array, max_distance: int) -> np.array:
+    """Euclidean distance from every cell to the closest `True` cell of `grid`
+
+    Distances are exact up to `max_distance`, further cells get `max_distance`
+    """
+
+    height, width = grid.shape
+    far = max_distance + 1
+
+    if not grid.any():
+        return np.full(grid.shape, max_distance, dtype=np.float32)
+
+    # Vertical distance to the closest cell in the same column
+    rows = np.arange(height, dtype=np.int32)[:, None]
+    above = np.maximum.accumulate(np.where(grid, rows, -far), axis=0)
+    below = np.where(grid, rows, height + far)[::-1]
+    below = np.minimum.accumulate(below, axis=0)[::-1]
+    vertical = np.minimum(np.minimum(rows - above, below - rows), far)
+
+    # Combine with the columns at most `max_distance` away (in 16 bits while the
+    # squared distances fit), until the columns left are further than any distance found
+    dtype = np.uint16 if 2 * far * far <= np.iinfo(np.uint16).max else np.uint32
+    squared = vertical.astype(dtype) ** 2
+    distance = squared.copy()
+    shifted = np.empty_like(squared)
+    furthest = far * far
+    for dx in range(1, min(max_distance, width - 1) + 1):
+        if dx % 8 == 0:
+            furthest = distance.max()
+        if dx * dx >= furthest:
+            break
+
+        np.add(squared[:, :-dx], dx * dx, out=shifted[:, :-dx])
+        np.minimum(distance[:, dx:], shifted[:, :-dx], out=distance[:, dx:])
+        np.add(squared[:, dx:], dx * dx, out=shifted[:, dx:])
+        np.minimum(distance[:, :-dx], shifted[:, dx:], out=distance[:, :-dx])
+
+    return np.minimum(np.sqrt(distance, dtype=np.float32), max_distance)
+
+
+def find_runs(mask: np.array) -> tuple[np.array]:
+    """Horizontal runs of `True` cells of `mask`, as rows, starts and ends (excluded)"""
+
+    height, width = mask.shape
+
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    return rows, starts, ends
+
+
+def find_overlaps(rows: np.array, starts: np.array, ends: np.array, width: int):
+    """Pairs of runs (sorted by row and start) that overlap, the second one being in
+    the next row, as the indexes of the first and second runs"""
+
+    start_keys = rows * (width + 1) + starts
+    end_keys = rows * (width + 1) + ends
+    first = np.searchsorted(end_keys, start_keys + width + 1, side="right")
+    last = np.searchsorted(start_keys, end_keys + width + 1, side="left")
+    counts = np.maximum(last - first, 0)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return np.repeat(np.arange(len(rows)), counts), np.repeat(first, counts) + offsets
+
+
+def label_runs(rows: np.array, starts: np.array, ends: np.array, width: int) -> tuple:
+    """Labels the 4-connected components made by runs sorted by row and start
+
+    Returns the label of each run (1 to n) and the number of components n
+    """
+
+    n_runs = len(rows)
+
+    # Runs in consecutive rows that overlap are connected
+    run_a, run_b = find_overlaps(rows, starts, ends, width)
+
+    # Union find over the runs
+    parent = list(range(n_runs))
+    for a, b in zip(run_a.tolist(), run_b.tolist()):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    roots = np.array(parent, dtype=np.int64)
+    while True:
+        jumped = roots[roots]
+        if np.array_equal(jumped, roots):
+            break
+        roots = jumped
+    _, run_labels = np.unique(roots, return_inverse=True)
+    run_labels = run_labels.astype(np.int32) + 1
+
+    return run_labels, int(run_labels.max(initial=0))
+
+
+def dilate(mask: np.array, top: int, left: int, shape: tuple) -> tuple:
+    """Grows the `mask` of a window (at `top`, `left` of a grid of `shape`) to its 8
+    neighbours, in the window a cell bigger on each side (inside the grid)
+
+    Returns the grown mask and the slices of its window in the grid
+    """
+
+    height, width = shape
+    bottom, right = top + mask.shape[0], left + mask.shape[1]
+    window = (
+        slice(max(top - 1, 0), min(bottom + 1, height)),
+        slice(max(left - 1, 0), min(right + 1, width)),
+    )
+
+    vertical = np.zeros(
+        (window[0].stop - window[0].start, window[1].stop - window[1].start), bool
+    )
+    vertical[
+        top - window[0].start : bottom - window[0].start,
+        left - window[1].start : right - window[1].start,
+    ] = mask
+    vertical[1:] |= vertical[:-1].copy()
+    vertical[:-1] |= vertical[1:].copy()
+    grown = vertical.copy()
+    grown[:, 1:] |= vertical[:, :-1]
+    grown[:, :-1] |= vertical[:, 1:]
+
+    return grown, window
@@ -1,19 +1,83 @@
+import math
+from collections import OrderedDict
+
 import numpy as np
 
 from .robot import VacuumRobot
+from .dust import DustMap
+from .coverage import Coverage, get_footprint
+from .grid import distance_transform, find_runs, label_runs
+from .tiles import BitTiles, get_overlaps
 
 
 class House:
-    """Represents a house with dust"""
-
-    def __init__(self, width: int, height: int, walls: np.array) -> None:
+    """Represents a house with dust
+
+    The walls are kept in bit-packed tiles and the distance to them is computed per
+    tile when first needed, so big houses only use memory where there are walls
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        walls,
+        max_distance: int = 64,
+        tile_size: int = 256,
+        cached_tiles: int = 64,
+        local_size: int = 1024,
+        local_cells: int = 1 << 22,
+        max_tries: int = 1000,
+    ) -> None:
         self.width = width
         self.heigth = height
-        self.walls = np.full((height, width), False)
-        self.dust = np.full((height, width), False)
-
-        for w in walls:
-            self.walls[w[1], w[0]] = True
+        self.dust = DustMap()
+
+        # Walls given as tiles, a grid or the (x, y) coordinates of the wall pixels
+        if isinstance(walls, BitTiles):
+            if (walls.height, walls.width) != (height, width):
+                raise ValueError("Walls tiles don't fit the house")
+            self.walls = walls
+        elif isinstance(walls, np.ndarray) and walls.dtype == bool:
+            if walls.shape != (height, width):
+                raise ValueError(f"Walls of shape {walls.shape} don't fit the house")
+            self.walls = BitTiles.from_array(walls, tile_size)
+        else:
+            coords = np.array(list(walls), dtype=np.intp).reshape(-1, 2)
+            self.walls = BitTiles(width, height, tile_size)
+            self.walls.set_points(coords[:, 0], coords[:, 1])
+
+        # Distance from each pixel to the closest wall (up to `max_distance`), per tile
+        self.max_distance = max_distance
+        self.cached_tiles = cached_tiles
+        self.distance_tiles = OrderedDict()  # Least recently used first
+
+        # The inside of the house is the biggest free region not reaching the borders
+        rows, starts, ends = self.find_interior()
+        self.interior_starts = rows * (width + 1) + starts  # Keys of the runs
+        self.interior_ends = rows * (width + 1) + ends
+        lengths = ends - starts
+        self.interior_offsets = np.cumsum(lengths) - lengths  # Cells before each run
+        self.interior_size = int(lengths.sum())
+
+        # Free spots are drawn from the inside until one is far enough from the walls,
+        # only when they are scarce all of them are found (flat indexes, by clearance)
+        self.max_tries = max_tries
+        self.free_cells = {}
+
+        # Steps the robot spent over each cell while vacuuming
+        self.coverage = Coverage(width, height, tile_size)
+
+        # Dense copy of the walls and distances around the robot, for the step queries
+        # (of the whole house, if it has at most `local_cells`)
+        self.local_size = local_size
+        self.local_left = self.local_top = self.local_right = self.local_bottom = 0
+        self.local_walls = None
+        self.local_free = None
+        self.local_distance = None
+        if width * height <= local_cells:
+            self.local_size = max(width, height)
+            self.update_local(0, 0, 0)
 
         (
             self.min_x,
@@ -22,132 +86,441 @@ class House:
             self.max_y,
         ) = self.get_surrounding_rectangle()
 
-    def get_free_spot(self) -> tuple:
-        """Returns a free spot on the map"""
+    def find_interior(self) -> tuple[np.array]:
+        """Runs (rows, starts, ends) of the biggest free region not reaching the borders"""
 
-        while True:
-            x = np.random.randint(self.min_x + 1, self.max_x)
-            y = np.random.randint(self.min_y + 1, self.max_y)
+        size = self.walls.tile_size
+        runs = []
+        for top in range(0, self.heigth, size):
+            bottom = min(top + size, self.heigth)
+            rows, starts, ends = find_runs(
+                ~self.walls.get_array(0, top, self.width, bottom)
+            )
+            runs.append((rows + top, starts, ends))
+        rows, starts, ends = (np.concatenate(r) for r in zip(*runs))
+
+        labels, n = label_runs(rows, starts, ends, self.width)
+        sizes = np.bincount(labels, weights=ends - starts, minlength=n + 1)
+        outside = (
+            (rows == 0)
+            | (rows == self.heigth - 1)
+            | (starts == 0)
+            | (ends == self.width)
+        )
+        sizes[labels[outside]] = 0
+        sizes[0] = 0
+        if not sizes.any():
+            return rows[:0], starts[:0], ends[:0]
+
+        inside = labels == sizes.argmax()
+
+        return rows[inside], starts[inside], ends[inside]
+
+    def get_distance_tile(self, row: int, column: int) -> np.array:
+        """Distances of a tile, `None` if all its cells are `max_distance` from walls"""
+
+        key = (row, column)
+        if key in self.distance_tiles:
+            self.distance_tiles.move_to_end(key)
+            return self.distance_tiles[key]
+
+        # Only the walls up to `max_distance` around the tile matter
+        size = self.walls.tile_size
+        margin = self.max_distance
+        left, top = column * size - margin, row * size - margin
+        right, bottom = left + size + 2 * margin, top + size + 2 * margin
+
+        tile = None
+        if self.walls.any(left, top, right, bottom):
+            walls = self.walls.get_array(left, top, right, bottom)
+            tile = distance_transform(walls, margin)[
+                margin : margin + size, margin : margin + size
+            ]
+
+        self.distance_tiles[key] = tile
+        if len(self.distance_tiles) > self.cached_tiles:
+            self.distance_tiles.popitem(last=False)
+
+        return tile
+
+    def get_distance_array(self, left: int, top: int, right: int, bottom: int):
+        """Distances of a region (right and bottom excluded) inside the house"""
 
-            # Generate a spot for robot without walls, dust and inside the house
-            if (
-                not self.walls[y, x]
-                and not self.dust[y, x]
-                and self.is_inside_house(x, y)
-            ):
+        region = np.full((bottom - top, right - left), self.max_distance, np.float32)
 
+        for row, column, inside, part in get_overlaps(
+            left, top, right, bottom, self.width, self.heigth, self.walls.tile_size
+        ):
+            tile = self.get_distance_tile(row, column)
+            if tile is not None:
+                region[inside] = tile[part]
+
+        return region
+
+    def update_local(self, x: float, y: float, margin: float) -> None:
+        """Makes the dense copy around the robot cover `margin` pixels around (`x`, `y`)"""
+
+        if (
+            self.local_walls is not None
+            and (x - margin >= self.local_left or self.local_left == 0)
+            and (y - margin >= self.local_top or self.local_top == 0)
+            and (x + margin < self.local_right or self.local_right == self.width)
+            and (y + margin < self.local_bottom or self.local_bottom == self.heigth)
+        ):
+            return
+
+        # Centered in the robot, unless the house is smaller
+        width = min(self.local_size, self.width)
+        height = min(self.local_size, self.heigth)
+        left = int(np.clip(x - width // 2, 0, self.width - width))
+        top = int(np.clip(y - height // 2, 0, self.heigth - height))
+
+        self.local_left, self.local_top = left, top
+        self.local_right, self.local_bottom = left + width, top + height
+        self.local_walls = self.walls.get_array(
+            left, top, self.local_right, self.local_bottom
+        )
+        self.local_free = ~self.local_walls
+
+        if width == self.width and height == self.heigth:
+            self.local_distance = distance_transform(
+                self.local_walls, self.max_distance
+            )
+        else:
+            self.local_distance = self.get_distance_array(
+                left, top, self.local_right, self.local_bottom
+            )
+
+    def get_free_cells(self, clearance: float = 0) -> np.array:
+        """Returns the flat indexes of the free cells inside, `clearance` away from walls"""
+
+        if clearance in self.free_cells:
+            return self.free_cells[clearance]
+
+        size = self.walls.tile_size
+        width = self.width + 1
+
+        # Tiles with some run of the inside
+        rows = self.interior_starts // width
+        first = self.interior_starts % width // size
+        counts = (self.interior_ends - 1) % width // size - first + 1
+        columns = np.repeat(first, counts) + (
+            np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        )
+        tiles = np.unique(np.repeat(rows // size, counts) * width + columns)
+
+        cells = []
+        for row, column in zip(*np.divmod(tiles, width)):
+            tile = self.get_distance_tile(row, column)
+            if tile is None:
+                if clearance >= self.max_distance:
+                    continue
+                ys, xs = np.divmod(np.arange(size * size), size)
+            else:
+                ys, xs = np.nonzero(tile > clearance)
+            xs, ys = xs + column * size, ys + row * size
+
+            inside = (xs < self.width) & (ys < self.heigth)
+            xs, ys = xs[inside], ys[inside]
+            inside = self.is_inside_house(xs, ys)
+            cells.append(ys[inside] * self.width + xs[inside])
+
+        self.free_cells[clearance] = np.sort(np.concatenate(cells + [np.zeros(0, int)]))
+
+        return self.free_cells[clearance]
+
+    def get_free_spot(self, clearance: float = 0) -> tuple:
+        """Returns a free spot on the map, further than `clearance` from the walls"""
+
+        # Distances to the walls stop at `max_distance`
+        if clearance >= self.max_distance:
+            raise ValueError(
+                f"Clearance {clearance} must be smaller than {self.max_distance}"
+            )
+
+        # Random spots inside, until one is far enough from the walls and without dust
+        if clearance not in self.free_cells:
+            for _ in range(self.max_tries if self.interior_size else 0):
+                i = np.random.randint(self.interior_size)
+                run = np.searchsorted(self.interior_offsets, i, side="right") - 1
+                y, x = divmod(int(self.interior_starts[run]), self.width + 1)
+                x += i - int(self.interior_offsets[run])
+
+                if self.get_wall_distance(x, y) > clearance and (x, y) not in self.dust:
+                    return (x, y)
+
+        # Free spots are scarce, choose from all of them
+        cells = self.get_free_cells(clearance)
+        if not len(cells):
+            raise ValueError(
+                f"No free spot inside the house with clearance {clearance}"
+            )
+
+        for _ in range(self.max_tries):
+            y, x = divmod(int(cells[np.random.randint(len(cells))]), self.width)
+
+            if (x, y) not in self.dust:
                 return (x, y)
 
+        # Almost all of them have dust, try each one
+        for cell in np.random.permutation(cells).tolist():
+            y, x = divmod(cell, self.width)
+
+            if (x, y) not in self.dust:
+                return (x, y)
+
+        raise ValueError(
+            f"No free spot without dust inside the house with clearance {clearance}"
+        )
+
     def dirty(self, x: int, y: int) -> None:
         """Puts dust in that spot"""
 
-        self.dust[y, x] = True
+        self.dust.add(x, y)
 
     def clean(self, x: int, y: int) -> None:
         """Cleans the dust from that spot"""
 
-        self.dust[y, x] = False
+        self.dust.remove(x, y)
 
-    def is_inside_house(self, x: int, y: int) -> bool:
-        """Checks if a point (`x`, `y`) is inside the house"""
+    def reset_dust(self) -> None:
+        """Removes all the dust"""
 
-        collisions = 0
+        self.dust = DustMap(self.dust.cell_size)
 
-        if self.walls[y, x]:
-            return False
+    def cover(self, x0: float, y0: float, x1: float, y1: float, radius: float) -> int:
+        """Marks the cells swept by a disc of `radius` moving from (`x0`, `y0`) to
+        (`x1`, `y1`) as covered, returns how many weren't yet"""
 
-        # Left border
-        for i in range(x, -1, -1):
-            if self.walls[y, i]:
-                collisions += 1
-                break
+        left, top, mask = get_footprint(x0, y0, x1, y1, radius)
+        right, bottom = left + mask.shape[1], top + mask.shape[0]
 
-        # Right border
-        for i in range(x, self.width):
-            if self.walls[y, i]:
-                collisions += 1
-                break
+        if (
+            self.local_left <= left
+            and self.local_top <= top
+            and right <= self.local_right
+            and bottom <= self.local_bottom
+        ):
+            mask &= self.local_free[
+                top - self.local_top : bottom - self.local_top,
+                left - self.local_left : right - self.local_left,
+            ]
+        else:
+            mask &= ~self.walls.get_array(left, top, right, bottom)
 
-        # Upper border
-        for i in range(y, -1, -1):
-            if self.walls[i, x]:
-                collisions += 1
-                break
+        return self.coverage.add(left, top, mask)
 
-        # Lower border
-        for i in range(y, self.heigth):
-            if self.walls[i, x]:
-                collisions += 1
-                break
+    def get_coverage(self) -> float:
+        """Percentage of the inside of the house already covered"""
+
+        return 100 * self.coverage.n_covered / max(self.interior_size, 1)
+
+    def reset_coverage(self) -> None:
+        """Forgets where the robot passed"""
+
+        self.coverage.reset()
+
+    def get_wall_distance(self, x: float, y: float) -> float:
+        """Returns the distance from (`x`, `y`) to the closest wall"""
+
+        x, y = round(x), round(y)
+        if (
+            self.local_left <= x < self.local_right
+            and self.local_top <= y < self.local_bottom
+        ):
+            return self.local_distance[y - self.local_top, x - self.local_left]
+
+        size = self.walls.tile_size
+        key = (y // size, x // size)
+        if key in self.distance_tiles:
+            tile = self.get_distance_tile(*key)
+            return self.max_distance if tile is None else tile[y % size, x % size]
+
+        # Cheaper than the distances of the whole tile, for one point
+        margin = self.max_distance
+        ys, xs = np.nonzero(
+            self.walls.get_array(x - margin, y - margin, x + margin + 1, y + margin + 1)
+        )
+        if not len(xs):
+            return self.max_distance
+
+        squared = np.float32(((xs - margin) ** 2 + (ys - margin) ** 2).min())
+        return min(np.sqrt(squared), margin)
+
+    def is_colliding(self, robot: VacuumRobot) -> bool:
+        """Checks if the robot is touching a wall or is outside the house limits"""
 
-        if collisions == 4:
+        x, y = robot.pose.x, robot.pose.y
+        r = robot.get_radius()
+
+        if x - r < 0 or y - r < 0 or x + r > self.width or y + r > self.heigth:
             return True
+
+        self.update_local(x, y, r + 1)
+
+        return (
+            self.local_distance[round(y) - self.local_top, round(x) - self.local_left]
+            <= r
+        )
+
+    def get_clearance(self, x: float, y: float, radius: float) -> float:
+        """Returns how far a disc of `radius` in (`x`, `y`) is from touching a wall or
+        the house limits (not positive if it touches them)"""
+
+        return min(
+            float(self.get_wall_distance(x, y)) - radius,
+            x - radius,
+            y - radius,
+            self.width - x - radius,
+            self.heigth - y - radius,
+        )
+
+    def get_impact(
+        self,
+        x0: float,
+        y0: float,
+        x1: float,
+        y1: float,
+        radius: float,
+        precision: float = 0.1,
+    ) -> tuple:
+        """Moves a disc of `radius` from (`x0`, `y0`) to (`x1`, `y1`) until it touches a
+        wall or the house limits, returns the fraction of the way it can move without
+        touching them (1 if it never does) and the normal of the contact (`None` then)
+
+        The disc advances as far as its clearance guarantees it doesn't touch anything
+        (the distances are of the closest pixel, up to half a diagonal off), or at
+        least to the next pixel its center enters, and the contact is then found up to
+        `precision` pixels
+        """
+
+        x0, y0, dx, dy = float(x0), float(y0), float(x1 - x0), float(y1 - y0)
+        length = math.hypot(dx, dy)
+        self.update_local(
+            (x0 + x1) / 2,
+            (y0 + y1) / 2,
+            min(length / 2 + radius + 1, self.local_size / 2),
+        )
+
+        # Last fraction known to be free and the next one checked
+        free, t = 0.0, 0.0
+        while True:
+            clearance = self.get_clearance(x0 + t * dx, y0 + t * dy, radius)
+            if clearance <= 0:
+                break
+            free = t
+            safe = (clearance - math.sqrt(2)) - (1 - t) * length
+            if t == 1 or safe >= 0 or not length:
+                return 1.0, None
+
+            # Pixels are entered when a coordinate crosses a half
+            x, y = x0 + t * dx, y0 + t * dy
+            entered = min(
+                (math.floor(x + 0.5) + math.copysign(0.5, dx) - x0) / dx if dx else 1,
+                (math.floor(y + 0.5) + math.copysign(0.5, dy) - y0) / dy if dy else 1,
+            )
+            t = min(max(1 + safe / length, entered + 1e-9), 1.0)
+
+        # Touching since the start
+        if t == 0:
+            return 0.0, self.get_normal(x0, y0, radius)
+
+        while (t - free) * length > precision:
+            middle = (free + t) / 2
+            if self.get_clearance(x0 + middle * dx, y0 + middle * dy, radius) > 0:
+                free = middle
+            else:
+                t = middle
+
+        return free, self.get_normal(x0 + t * dx, y0 + t * dy, radius)
+
+    def get_normal(self, x: float, y: float, radius: float) -> np.array:
+        """Returns the unit vector from the closest wall (or house limit) to a disc of
+        `radius` in (`x`, `y`) touching it"""
+
+        # House limits, as the closest points in them
+        points = [(-1, y), (x, -1), (self.width, y), (x, self.heigth)]
+
+        margin = math.ceil(radius) + 2
+        left, top = round(x) - margin, round(y) - margin
+        right, bottom = left + 2 * margin + 1, top + 2 * margin + 1
+        if (
+            self.local_left <= left
+            and self.local_top <= top
+            and right <= self.local_right
+            and bottom <= self.local_bottom
+        ):
+            walls = self.local_walls[
+                top - self.local_top : bottom - self.local_top,
+                left - self.local_left : right - self.local_left,
+            ]
         else:
-            return False
+            walls = self.walls.get_array(left, top, right, bottom)
+        ys, xs = np.nonzero(walls)
+        if len(xs):
+            closest = np.argmin((xs + left - x) ** 2 + (ys + top - y) ** 2)
+            points.append((int(xs[closest]) + left, int(ys[closest]) + top))
+
+        wall_x, wall_y = min(points, key=lambda p: math.hypot(x - p[0], y - p[1]))
+        distance = math.hypot(x - wall_x, y - wall_y)
+        if not distance:
+            return np.zeros(2)
+
+        return np.array([x - wall_x, y - wall_y]) / distance
+
+    def is_inside_house(self, x, y):
+        """Checks if points (`x`, `y`) are inside the house"""
+
+        key = np.asarray(y) * (self.width + 1) + x
+        if not len(self.interior_starts):
+            return np.zeros_like(key, dtype=bool)
+
+        run = np.searchsorted(self.interior_starts, key, side="right") - 1
+
+        return (run >= 0) & (key < self.interior_ends[run])
 
     def get_surrounding_rectangle(self) -> tuple[int]:
         """Returns the coordinates of a rectangle that envolves all the walls"""
 
-        min_x = 0
-        max_x = self.width
-        min_y = 0
-        max_y = self.heigth
+        bounds = self.walls.get_bounds()
+        if bounds is None:
+            return 0, self.width, 0, self.heigth
 
-        # Left border
-        for i in range(0, self.width):
-            if np.any(self.walls[:, i]):
-                min_x = i
-                break
+        return bounds
 
-        # Right border
-        for i in range(self.width - 1, -1, -1):
-            if np.any(self.walls[:, i]):
-                max_x = i
-                break
+    def get_wall_readings(self, robot: VacuumRobot) -> tuple[bool]:
+        """Checks if the back and front of the robot right side are close to a wall"""
 
-        # Upper border
-        for i in range(0, self.heigth):
-            if np.any(self.walls[i, :]):
-                min_y = i
-                break
+        pose = robot.pose
+        x, y, theta = pose.x, pose.y, pose.theta
+        sensor = robot.wall_sensor
+        self.update_local(x, y, sensor.reach)
 
-        # Lower border
-        for i in range(self.heigth - 1, -1, -1):
-            if np.any(self.walls[i, :]):
-                max_y = i
-                break
+        return sensor.read(
+            self.local_walls, x - self.local_left, y - self.local_top, theta
+        )
 
-        return min_x, max_x, min_y, max_y
+    def get_lidar_ranges(self, robot: VacuumRobot) -> np.array:
+        """Returns the distance to the walls or the house limits along each lidar beam
+        (a view valid until the next scan)
 
-    def is_following_wall(self, robot: VacuumRobot, point):
-        """Checks if the robot is following a wall (its back right side is close to the wall)"""
+        The distances around the robot are kept while it stays in the same area, so
+        only its first scan there computes them. Beams are cut at the dense copy, that
+        covers the lidar range if it is at most half of `local_size`
+        """
 
-        *pos, theta = robot.get_state()
-        r = int(robot.get_radius())
+        pose = robot.pose
+        x, y, theta = pose.x, pose.y, pose.theta
+        lidar = robot.lidar
+        self.update_local(x, y, min(lidar.max_range, self.local_size / 2))
 
-        R = np.array(
-            [
-                [np.cos(theta), np.sin(theta)],
-                [-np.sin(theta), np.cos(theta)],
-            ]
+        return lidar.scan(
+            self.local_distance, x - self.local_left, y - self.local_top, theta
         )
 
-        if point == "back":
-            follow_point = R @ np.array([-r, r]) + pos
-        else:
-            follow_point = R @ np.array([r, r]) + pos
-
-        # Generate pixels at the right of the robot
-        check_points = []
-        for r in range(-r, r // 4):
-            check_points.append(
-                follow_point
-                + r * np.array([np.cos(theta - np.pi / 2), -np.sin(theta - np.pi / 2)])
-            )
+    def is_following_wall(self, robot: VacuumRobot, point) -> bool:
+        """Checks if the robot is following a wall (its back right side is close to the wall)"""
 
-        check_points = np.array(check_points, dtype=int)
-        try:
-            return np.any(self.walls[check_points[:, 1], check_points[:, 0]])
+        back, front = self.get_wall_readings(robot)
 
-        except IndexError:
-            return False
+        return back if point == "back" else front
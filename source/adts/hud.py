@@ -0,0 +1,58 @@
+import pygame
+
+
+class Hud:
+    """Lines of text from a top left corner, only rendered again when they change"""
+
+    def __init__(
+        self,
+        font: pygame.font.Font,
+        color: tuple,
+        n_lines: int,
+        corner: tuple = (0, 0),
+        max_cached: int = 128,
+    ) -> None:
+        self.font = font
+        self.corner = corner
+        self.color = color
+        self.max_cached = max_cached
+        self.rendered = {}  # Text -> rendered surface
+
+        self.lines = [""] * n_lines
+        self.surfaces = [self.render("")] * n_lines
+        self.stack()
+
+    def render(self, text: str) -> pygame.Surface:
+        """Renders the text, reusing the surface if it was rendered before"""
+
+        if text not in self.rendered:
+            if len(self.rendered) >= self.max_cached:
+                self.rendered.pop(next(iter(self.rendered)))
+            self.rendered[text] = self.font.render(text, 1, self.color)
+
+        return self.rendered[text]
+
+    def set_line(self, i: int, text: str) -> None:
+        """Changes the text of line `i`"""
+
+        if text != self.lines[i]:
+            self.lines[i] = text
+            self.surfaces[i] = self.render(text)
+            self.stack()
+
+    def stack(self) -> None:
+        """Places the lines one below the other"""
+
+        x, y = self.corner
+        texts = []
+        for surface in self.surfaces:
+            texts.append((surface, (x, y)))
+            y += surface.get_height()
+
+        # New list (the old one is never changed), so drawing can tell it changed
+        self.texts = texts
+
+    def get_texts(self) -> list:
+        """Getter for the pairs of rendered line and position"""
+
+        return self.texts
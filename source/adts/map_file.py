@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+
+from .tiles import BitTiles
+
+MAGIC = b"VRMAP001"
+SIZE_DTYPE = np.dtype([("width", "<u4"), ("height", "<u4"), ("header", "<u4")])
+ALIGNMENT = 64
+
+
+def write_rows(file, walls) -> None:
+    """Writes the rows of a walls grid or tiles bit-packed, a strip at a time"""
+
+    if isinstance(walls, BitTiles):
+        for top in range(0, walls.height, walls.tile_size):
+            bottom = min(top + walls.tile_size, walls.height)
+            file.write(walls.get_packed_rows(top, bottom).tobytes())
+    else:
+        file.write(np.packbits(walls, axis=1).tobytes())
+
+
+def save_map(path: str, walls, metadata: dict = None) -> None:
+    """Saves a walls grid or tiles, each row bit-packed, with its size and `metadata`
+
+    The file has the magic, the width, height and length of the JSON metadata, the
+    metadata and the packed rows (aligned to 64 bytes)
+    """
+
+    if isinstance(walls, BitTiles):
+        width, height = walls.width, walls.height
+    else:
+        height, width = walls.shape
+    encoded = json.dumps(metadata or {}).encode()
+    size = np.array([(width, height, len(encoded))], SIZE_DTYPE)
+    offset = len(MAGIC) + SIZE_DTYPE.itemsize + len(encoded)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(size.tobytes())
+        f.write(encoded)
+        f.write(bytes(-offset % ALIGNMENT))
+        write_rows(f, walls)
+
+
+def map_rows(path: str) -> tuple[np.memmap, int, dict]:
+    """Memory-maps the packed rows of a map file, returns them, the width and metadata"""
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a map file")
+
+        size = np.frombuffer(f.read(SIZE_DTYPE.itemsize), SIZE_DTYPE)[0]
+        metadata = json.loads(f.read(int(size["header"])))
+
+    width, height = int(size["width"]), int(size["height"])
+    offset = len(MAGIC) + SIZE_DTYPE.itemsize + int(size["header"])
+    offset += -offset % ALIGNMENT
+    rows = np.memmap(path, np.uint8, "r", offset, (height, -(-width // 8)))
+
+    return rows, width, metadata
+
+
+def load_map(path: str) -> tuple[np.array, dict]:
+    """Loads the walls grid and the metadata of a map file"""
+
+    rows, width, metadata = map_rows(path)
+    walls = np.unpackbits(rows, axis=1, count=width).view(bool)
+
+    return walls, metadata
+
+
+def load_tiles(path: str, tile_size: int = 256) -> tuple[BitTiles, dict]:
+    """Loads the walls of a map file into tiles (never unpacking the whole grid)"""
+
+    rows, width, metadata = map_rows(path)
+
+    return BitTiles.from_packed_rows(rows, width, tile_size), metadata
@@ -0,0 +1,367 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .grid import dilate, distance_transform, find_runs, find_overlaps
+from .tiles import BitTiles
+
+NEIGHBOURS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# Plans by map hash and planning parameters, least recently used first
+PLANS = OrderedDict()
+CACHED_PLANS = 8
+
+
+def get_walls_hash(walls: BitTiles) -> str:
+    """Hash of the walls of a map (of its set tiles)"""
+
+    digest = hashlib.sha1(
+        np.array([walls.width, walls.height, walls.tile_size]).tobytes()
+    )
+    for key in sorted(walls.tiles):
+        digest.update(np.array(key).tobytes())
+        digest.update(walls.tiles[key].tobytes())
+
+    return digest.hexdigest()
+
+
+def get_plan(house, radius: float, lane_width: float = None, **kwargs) -> "Plan":
+    """Plan of a house for a robot of `radius`, only computed once per map
+
+    Lanes are 90% of the robot diameter apart by default
+    """
+
+    if lane_width is None:
+        lane_width = 1.8 * radius
+
+    key = (
+        get_walls_hash(house.walls),
+        radius,
+        lane_width,
+        tuple(sorted(kwargs.items())),
+    )
+    if key in PLANS:
+        PLANS.move_to_end(key)
+        return PLANS[key]
+
+    PLANS[key] = Plan(house, radius, lane_width, **kwargs)
+    if len(PLANS) > CACHED_PLANS:
+        PLANS.popitem(last=False)
+
+    return PLANS[key]
+
+
+def find_path(free: np.array, start: tuple, targets: np.array) -> list:
+    """Shortest 8-connected path of free cells from `start` to the closest target
+    cell, as (row, column) pairs, `None` if no target can be reached"""
+
+    height, width = free.shape
+    distance = np.full(free.shape, -1, dtype=np.int32)
+    distance[start] = 0
+
+    # Cells reached last, in a window (at `top`, `left`) growing a cell per ring
+    (top, left), d = start, 0
+    frontier = np.ones((1, 1), dtype=bool)
+    while True:
+        bottom, right = top + frontier.shape[0], left + frontier.shape[1]
+        reached = frontier & targets[top:bottom, left:right]
+        if reached.any():
+            break
+        if not frontier.any():
+            return None
+
+        grown, window = dilate(frontier, top, left, free.shape)
+
+        d += 1
+        frontier = grown & free[window] & (distance[window] < 0)
+        distance[window][frontier] = d
+        top, left = window[0].start, window[1].start
+
+    # Walk back to the start through cells closer to it
+    row, column = (int(i) for i in np.argwhere(reached)[0] + (top, left))
+    path = [(row, column)]
+    while d > 0:
+        d -= 1
+        for dy, dx in NEIGHBOURS:
+            r, c = row + dy, column + dx
+            if 0 <= r < height and 0 <= c < width and distance[r, c] == d:
+                row, column = r, c
+                break
+        path.append((row, column))
+
+    return path[::-1]
+
+
+def simplify(path: list) -> list:
+    """Path without the points in the middle of straight segments"""
+
+    points = [path[0]]
+    for i in range(1, len(path) - 1):
+        (r0, c0), (r1, c1), (r2, c2) = points[-1], path[i], path[i + 1]
+        if (r1 - r0) * (c2 - c1) != (c1 - c0) * (r2 - r1) or (r1 - r0) * (r2 - r1) + (
+            c1 - c0
+        ) * (c2 - c1) < 0:
+            points.append(path[i])
+    if len(path) > 1:
+        points.append(path[-1])
+
+    return points
+
+
+def get_grid_step(house, radius: float, max_cells: int = 1 << 20) -> int:
+    """Side of the cells of a grid of the house for a robot of `radius`, a fifth of
+    the radius unless the grid would have more than `max_cells`"""
+
+    return max(
+        round(radius / 5),
+        int(np.ceil(np.sqrt(house.width * house.heigth / max_cells))),
+        1,
+    )
+
+
+def get_free_grid(house, step: int, clearance: float) -> np.array:
+    """Grid of `step` pixels cells inside the house with their center further than
+    `clearance` from the walls"""
+
+    height, width = -(-house.heigth // step), -(-house.width // step)
+
+    # Cells with some wall, a strip of tiles at a time
+    walls = np.zeros((height, width), dtype=bool)
+    strip = max(house.walls.tile_size // step, 1)
+    for top in range(0, height, strip):
+        pixels = house.walls.get_array(
+            0, top * step, width * step, (top + strip) * step
+        )
+        blocks = pixels.reshape(strip, step, width, step).any(axis=(1, 3))
+        walls[top : top + strip] = blocks[: height - top]
+
+    # The walls can be anywhere in their cells (up to half a diagonal from the center)
+    margin = int(np.ceil(clearance / step)) + 2
+    distance = distance_transform(walls, margin) * step - (step - 1) / np.sqrt(2)
+
+    rows, columns = np.nonzero(distance > clearance)
+    centers = get_centers(np.stack((rows, columns), axis=1), step).astype(int)
+    inside = house.is_inside_house(centers[:, 0], centers[:, 1])
+
+    free = np.zeros((height, width), dtype=bool)
+    free[rows[inside], columns[inside]] = True
+
+    return free
+
+
+def get_centers(cells: np.array, step: int) -> np.array:
+    """Positions (x, y) in the house of the centers of grid cells (row, column)"""
+
+    return cells[:, ::-1] * step + (step - 1) / 2
+
+
+class Plan:
+    """Closed tours sweeping the inside of a house with a robot, one per region it
+    can reach
+
+    The house is planned in a grid of `step` pixels cells, only the ones further than
+    the robot radius plus `margin` from the walls are free. Their horizontal runs are
+    split in boustrophedon cells (where runs of consecutive rows overlap one to one),
+    each swept in lanes up to `lane_width` apart, and the cells are visited closest
+    first
+    """
+
+    def __init__(
+        self,
+        house,
+        radius: float,
+        lane_width: float,
+        step: int = None,
+        margin: float = 2,
+        max_cells: int = 1 << 20,
+    ) -> None:
+        self.step = max(
+            get_grid_step(house, radius, max_cells) if step is None else step, 1
+        )
+        self.free = self.get_free_grid(house, radius + margin)
+
+        # Boustrophedon cells, lists of runs in consecutive rows
+        self.rows, self.starts, self.ends = find_runs(self.free)
+        above, below = find_overlaps(
+            self.rows, self.starts, self.ends, self.free.shape[1]
+        )
+        n_below = np.bincount(above, minlength=len(self.rows))
+        n_above = np.bincount(below, minlength=len(self.rows))
+        follows = {
+            a: b
+            for a, b in zip(above.tolist(), below.tolist())
+            if n_below[a] == 1 and n_above[b] == 1
+        }
+        continued = set(follows.values())
+
+        cells = []
+        for run in range(len(self.rows)):
+            if run in continued:
+                continue
+            cell = [run]
+            while cell[-1] in follows:
+                cell.append(follows[cell[-1]])
+            cells.append(cell)
+
+        # Sweeps of each cell, starting from its 4 corners (by first lane end and order)
+        lanes = max(int(lane_width // self.step), 1)
+        sweeps = []
+        for cell in cells:
+            left = self.sweep_cell(cell, lanes, False)
+            right = self.sweep_cell(cell, lanes, True)
+            sweeps.append([left, right, left[::-1], right[::-1]])
+
+        # Entries of the cells not swept yet, mapped to their cells and sweeps
+        targets = np.zeros_like(self.free)
+        entries = {}
+        for cell, cell_sweeps in enumerate(sweeps):
+            for i, sweep in enumerate(cell_sweeps):
+                targets[sweep[0]] = True
+                entries.setdefault(sweep[0], []).append((cell, i))
+
+        def remove(cell: int) -> None:
+            """Removes the entries of a swept cell"""
+
+            for i, sweep in enumerate(sweeps[cell]):
+                entries[sweep[0]].remove((cell, i))
+                if not entries[sweep[0]]:
+                    del entries[sweep[0]]
+                    targets[sweep[0]] = False
+
+        # Each tour goes to the closest cell not swept yet, until none can be reached
+        self.tours = []
+        todo = set(range(len(cells)))
+        while todo:
+            first = min(todo)
+            todo.remove(first)
+            remove(first)
+            tour = list(sweeps[first][0])
+
+            while todo:
+                path = find_path(self.free, tour[-1], targets)
+                if path is None:
+                    break
+
+                cell, i = entries[path[-1]][0]
+                todo.remove(cell)
+                remove(cell)
+                tour += path[1:-1] + sweeps[cell][i]
+
+            path = find_path(self.free, tour[-1], self.get_mask([tour[0]]))
+            tour = simplify(tour + path[1:])
+            self.tours.append(np.array(tour))
+
+    def get_free_grid(self, house, clearance: float) -> np.array:
+        """Grid cells inside the house with their center further than `clearance`
+        from the walls"""
+
+        return get_free_grid(house, self.step, clearance)
+
+    def sweep_cell(self, cell: list, lanes: int, reverse: bool) -> list:
+        """Zigzag through the rows of a cell, from the first lane start (the left end,
+        or the right one if `reverse`), lanes at most `lanes` rows apart
+
+        Between lanes the robot follows the cell boundary, going back along the other
+        side too when it bulges out more than a grid cell
+        """
+
+        rows = self.rows[cell].tolist()
+        bounds = (self.starts[cell].tolist(), (self.ends[cell] - 1).tolist())
+        right = reverse
+        path = [(rows[0], bounds[right][0])]
+
+        def trace(first: int, last: int, right: bool) -> None:
+            """Follows one side of the cell from row `first` to `last` (indexes)"""
+
+            step = 1 if last > first else -1
+            for i in range(first + step, last + step, step):
+                # Stay inside both this run and the previous one
+                column = path[-1][1]
+                moved = min(
+                    max(column, bounds[0][i], bounds[0][i - step]),
+                    bounds[1][i],
+                    bounds[1][i - step],
+                )
+                if moved != column:
+                    path.append((rows[i - step], moved))
+                path.append((rows[i], moved))
+                if moved != bounds[right][i]:
+                    path.append((rows[i], bounds[right][i]))
+
+        n_lanes = -(-(len(cell) - 1) // lanes) + 1
+        lane_rows = np.unique(np.round(np.linspace(0, len(cell) - 1, n_lanes)))
+        previous = None
+        for lane in lane_rows.astype(int).tolist():
+            if previous is not None:
+                trace(previous, lane, right)
+
+            right = not right
+            path.append((rows[lane], bounds[right][lane]))
+
+            if previous is not None and lane - previous > 1:
+                side = bounds[right]
+                if right:
+                    bulge = max(side[previous + 1 : lane]) - max(
+                        side[previous], side[lane]
+                    )
+                else:
+                    bulge = min(side[previous], side[lane]) - min(
+                        side[previous + 1 : lane]
+                    )
+                if bulge > 1:
+                    trace(lane, previous, right)
+                    trace(previous, lane, right)
+
+            previous = lane
+
+        return simplify(path)
+
+    def get_mask(self, cells: list) -> np.array:
+        """Grid with only the `cells` set"""
+
+        mask = np.zeros_like(self.free)
+        mask[tuple(np.array(cells).T)] = True
+
+        return mask
+
+    def get_centers(self, cells: np.array) -> np.array:
+        """Positions (x, y) in the house of the centers of grid cells (row, column)"""
+
+        return get_centers(cells, self.step)
+
+    def get_waypoints(self, x: float, y: float) -> np.array:
+        """Positions to go through from (`x`, `y`), reaching the closest tour and
+        following it back to where it was reached
+
+        Empty if no tour can be reached
+        """
+
+        # Start from the closest free cell
+        if not self.tours:
+            return np.zeros((0, 2))
+        cells = np.argwhere(self.free)
+        start = tuple(
+            int(i)
+            for i in cells[np.argmin(np.hypot(*(self.get_centers(cells) - (x, y)).T))]
+        )
+
+        tour_cells = np.concatenate(self.tours)
+        path = find_path(self.free, start, self.get_mask(tour_cells))
+        if path is None:
+            return np.zeros((0, 2))
+
+        for tour in self.tours:
+            reached = np.flatnonzero((tour == path[-1]).all(axis=1))
+            if len(reached):
+                break
+        i = int(reached[0])
+
+        # The tours are closed, their last point is the first
+        waypoints = (
+            path[:-1]
+            + [tuple(p) for p in tour[i:]]
+            + [tuple(p) for p in tour[1 : i + 1]]
+        )
+
+        return self.get_centers(np.array(simplify(waypoints)))
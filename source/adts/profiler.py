@@ -0,0 +1,88 @@
+import csv
+import json
+import time
+from enum import IntEnum
+
+import numpy as np
+
+
+class Phase(IntEnum):
+    """Phases of a frame of the game loop (the simulation ones added over its steps)"""
+
+    EVENTS = 0
+    SENSORS = 1
+    CONTROLLER = 2
+    MOVE = 3
+    VACUUM = 4
+    COLLISION = 5
+    COVERAGE = 6
+    GAME = 7  # Sounds and sprites bookkeeping
+    DRAW = 8
+    TICK = 9  # Waiting for the next frame
+
+
+class FrameProfiler:
+    """Times each phase of the last `capacity` frames in a ring buffer"""
+
+    def __init__(self, capacity: int = 4096, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.capacity = capacity
+        self.times = np.zeros((capacity, len(Phase)), dtype=np.int64)  # Nanoseconds
+        self.n_frames = 0
+        self.row = self.times[0]
+        self.last = 0
+
+    def start_frame(self) -> None:
+        """Starts timing a new frame"""
+
+        if not self.enabled:
+            return
+
+        self.row = self.times[self.n_frames % self.capacity]
+        self.row[:] = 0
+        self.n_frames += 1
+        self.last = time.perf_counter_ns()
+
+    def lap(self, phase: Phase) -> None:
+        """Adds the time since the last lap to `phase`"""
+
+        if not self.enabled:
+            return
+
+        now = time.perf_counter_ns()
+        self.row[phase] += now - self.last
+        self.last = now
+
+    def get_trace(self) -> np.array:
+        """Recorded frames, oldest first, in milliseconds per phase"""
+
+        n = min(self.n_frames, self.capacity)
+        start = self.n_frames % self.capacity if self.n_frames > self.capacity else 0
+
+        return np.roll(self.times[:n], -start, axis=0) / 1e6
+
+    def get_breakdown(self, n_frames: int = 30) -> tuple:
+        """Frames per second and mean milliseconds per phase of the last `n_frames`"""
+
+        trace = self.get_trace()[-n_frames:]
+        if not len(trace):
+            return 0.0, np.zeros(len(Phase))
+
+        breakdown = trace.mean(axis=0)
+        return 1000 / max(breakdown.sum(), 1e-9), breakdown
+
+    def dump(self, path: str) -> None:
+        """Saves the recorded frames to a JSON or CSV file"""
+
+        trace = self.get_trace()
+        names = [phase.name.lower() for phase in Phase]
+
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump({"unit": "ms", "phases": names, "frames": trace.tolist()}, f)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + names)
+                first = self.n_frames - len(trace)
+                for i, row in enumerate(trace.tolist(), first):
+                    writer.writerow([i] + row)
@@ -0,0 +1,262 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from .robot import VacuumRobot
+from .dust import Dust, DustMap
+from .tiles import BitTiles
+from .coverage import Coverage
+
+
+class Renderer:
+    """Draws the game screen, updating only the regions that changed
+
+    The screen is a view of the house that follows the robot, only the walls tiles
+    inside it are drawn
+    """
+
+    def __init__(
+        self,
+        surface: pygame.Surface,
+        background_color: tuple,
+        wall_color: tuple,
+        walls: BitTiles,
+        dust_group: pygame.sprite.Group,
+        cached_tiles: int = 64,
+    ) -> None:
+        self.surface = surface
+        self.on_display = surface is pygame.display.get_surface()  # Or offscreen
+        self.background_color = background_color
+        self.wall_color = wall_color
+        self.walls = walls
+        self.tile_surfaces = OrderedDict()  # Least recently used first
+        self.cached_tiles = cached_tiles
+
+        self.dust = {tuple(d.get_pos()): d for d in dust_group}
+        self.order = {pos: i for i, pos in enumerate(self.dust)}  # Overlapping dust
+        self.dust_map = DustMap()
+        for x, y in self.dust:
+            self.dust_map.add(x, y)
+        self.dust_margin = max((max(d.rect.size) for d in dust_group), default=0)
+
+        # Position in the house of the top left corner of the screen
+        self.camera = (0, 0)
+
+        # Optional heatmap of the coverage drawn over the walls
+        self.coverage: Coverage = None
+        self.coverage_color = None
+
+        # Static layer with the walls (and heatmap) and background with dust, only
+        # patched when dust is removed (all of the region seen by the camera)
+        self.background = pygame.Surface(surface.get_size())
+        self.floor = self.background
+        self.scene = pygame.Surface(surface.get_size())
+        self.draw_view()
+
+        self.robot_rect = None  # Region of the robot in the last frame
+        self.texts = []  # Texts (pairs of surface and position) in the last frame
+        self.text_rects = []  # Regions of the texts in the last frame
+        self.patched = []  # Regions of the scene changed since the last frame
+        self.full_update = True
+
+    def get_tile_surface(self, row: int, column: int) -> pygame.Surface:
+        """Walls of a tile drawn over the background, `None` if it has no walls"""
+
+        key = (row, column)
+        if key in self.tile_surfaces:
+            self.tile_surfaces.move_to_end(key)
+            return self.tile_surfaces[key]
+
+        tile = self.walls.get_tile(row, column)
+        surface = None
+        if tile is not None:
+            colors = np.where(tile.T[..., None], self.wall_color, self.background_color)
+            surface = pygame.surfarray.make_surface(colors.astype(np.uint8))
+
+        self.tile_surfaces[key] = surface
+        if len(self.tile_surfaces) > self.cached_tiles:
+            self.tile_surfaces.popitem(last=False)
+
+        return surface
+
+    def draw_view(self) -> None:
+        """Draws the background and the scene of the region seen by the camera"""
+
+        left, top = self.camera
+        width, height = self.surface.get_size()
+        size = self.walls.tile_size
+
+        self.background.fill(self.background_color)
+        for row in range(
+            top // size, (min(top + height, self.walls.height) - 1) // size + 1
+        ):
+            for column in range(
+                left // size, (min(left + width, self.walls.width) - 1) // size + 1
+            ):
+                tile = self.get_tile_surface(row, column)
+                if tile is not None:
+                    self.background.blit(tile, (column * size - left, row * size - top))
+
+        self.floor = self.background
+        if self.coverage is not None:
+            self.floor = self.background.copy()
+            self.floor.blit(self.get_heatmap(), (0, 0))
+
+        self.scene.blit(self.floor, (0, 0))
+        margin = self.dust_margin
+        seen = self.dust_map.find(
+            left - margin, top - margin, left + width + margin, top + height + margin
+        )
+        for d in sorted(seen, key=self.order.get):
+            dust = self.dust[d]
+            self.scene.blit(dust.image, dust.rect.move(-left, -top))
+
+    def get_heatmap(self) -> pygame.Surface:
+        """Coverage of the region seen by the camera, more opaque where it was longer"""
+
+        left, top = self.camera
+        width, height = self.surface.get_size()
+        visits = self.coverage.get_array(left, top, left + width, top + height)
+        alpha = np.where(visits, 48 + 3 * np.minimum(visits, 48), 0).astype(np.uint8)
+
+        heatmap = pygame.Surface((width, height), pygame.SRCALPHA)
+        heatmap.fill(self.coverage_color)
+        pygame.surfarray.pixels_alpha(heatmap)[:] = alpha.T
+
+        return heatmap
+
+    def set_coverage(self, coverage: Coverage, color: tuple = None) -> None:
+        """Shows the heatmap of `coverage` in `color`, or hides it when `None`"""
+
+        self.coverage = coverage
+        self.coverage_color = color
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Draws everything again (to show the latest coverage)"""
+
+        self.draw_view()
+        self.patched = []
+        self.full_update = True
+
+    def follow(self, robot: VacuumRobot) -> bool:
+        """Moves the camera when the robot gets close to the screen edges
+
+        Returns if it moved (and everything has to be drawn again)
+        """
+
+        camera = tuple(
+            self.follow_axis(position, start, length, limit)
+            for position, start, length, limit in zip(
+                (robot.pose.x, robot.pose.y),
+                self.camera,
+                self.surface.get_size(),
+                (self.walls.width, self.walls.height),
+            )
+        )
+        if camera == self.camera:
+            return False
+
+        self.camera = camera
+        self.refresh()
+
+        return True
+
+    @staticmethod
+    def follow_axis(position: float, start: int, length: int, limit: int) -> int:
+        """Start of the view in one axis, centered in `position` when it gets close
+        to the edges, without showing outside the house"""
+
+        if start + length // 4 <= position < start + length - length // 4:
+            return start
+
+        return int(np.clip(round(position) - length // 2, 0, max(limit - length, 0)))
+
+    def get_camera(self) -> tuple[int]:
+        """Getter for the position in the house of the top left corner of the screen"""
+
+        return self.camera
+
+    def remove_dust(self, dust: Dust) -> None:
+        """Erases the dust from the scene"""
+
+        x, y = pos = tuple(dust.get_pos())
+        self.dust.pop(pos)
+        self.dust_map.remove(x, y)
+
+        left, top = self.camera
+        rect = dust.rect.move(-left, -top)
+        if not rect.colliderect(self.scene.get_rect()):
+            return
+
+        self.scene.blit(self.floor, rect, rect)
+
+        # Redraw the part of the neighbour dust that was under the removed one
+        self.scene.set_clip(rect)
+        neighbours = self.dust_map.find(
+            dust.rect.left - rect.width,
+            dust.rect.top - rect.height,
+            dust.rect.right + rect.width,
+            dust.rect.bottom + rect.height,
+        )
+        for d in sorted(neighbours, key=self.order.get):
+            neighbour = self.dust[d]
+            self.scene.blit(neighbour.image, neighbour.rect.move(-left, -top))
+        self.scene.set_clip(None)
+
+        self.patched.append(rect)
+
+    def draw(self, robot: VacuumRobot, texts: list) -> None:
+        """Draws the robot and the `texts` (pairs of surface and position) over the scene
+
+        The texts are only drawn again when they change or something was drawn over them
+        """
+
+        self.follow(robot)
+
+        # Erase last frame
+        if self.full_update:
+            self.surface.blit(self.scene, (0, 0))
+            erased = []
+        else:
+            erased = self.patched
+            if self.robot_rect is not None:
+                erased = [self.robot_rect] + erased
+            for rect in erased:
+                self.surface.blit(self.scene, rect, rect)
+
+        self.robot_rect = robot.draw(self.surface, self.camera)
+
+        redraw_texts = (
+            self.full_update
+            or texts != self.texts
+            or any(
+                rect.collidelist(self.text_rects) != -1
+                for rect in erased + [self.robot_rect]
+            )
+        )
+        if redraw_texts:
+            for rect in self.text_rects:
+                self.surface.blit(self.scene, rect, rect)
+            erased = erased + self.text_rects
+
+            # The robot could have been under the old texts
+            if self.robot_rect.collidelist(self.text_rects) != -1:
+                self.surface.blit(self.scene, self.robot_rect, self.robot_rect)
+                robot.draw(self.surface, self.camera)
+
+            self.texts = texts
+            self.text_rects = [self.surface.blit(t, pos) for t, pos in texts]
+
+        if not self.on_display:
+            self.full_update = False
+        elif self.full_update:
+            pygame.display.update()
+            self.full_update = False
+        else:
+            pygame.display.update(
+                erased + [self.robot_rect] + (self.text_rects if redraw_texts else [])
+            )
+
+        self.patched = []
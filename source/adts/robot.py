@@ -1,9 +1,83 @@
+import math
+from collections import OrderedDict
+
 import numpy as np
 import pygame
 
+from .sensors import WallSensor, Lidar
+
+
+class RotatedImages:
+    """Cache of an image rotated around a pivot, by quantized angles"""
+
+    def __init__(
+        self,
+        image: pygame.Surface,
+        pivot: tuple,
+        n_angles: int = 360,
+        max_size: int = 360,
+        smooth: bool = False,
+    ) -> None:
+        self.image = image
+        self.n_angles = n_angles
+        self.max_size = max_size
+        self.smooth = smooth
+        self.cache = OrderedDict()  # Quantized angle -> (rotated image, blit offset)
+
+        # Offset from the pivot to the image center
+        self.center_offset = pygame.math.Vector2(image.get_rect().center) - pivot
+
+    def get(self, angle: float) -> tuple:
+        """Returns the rotated image and its top left corner offset from the pivot"""
+
+        key = round(angle * self.n_angles / 360) % self.n_angles
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        angle = key * 360 / self.n_angles
+        if self.smooth:
+            rotated = pygame.transform.rotozoom(self.image, angle, 1)
+        else:
+            rotated = pygame.transform.rotate(self.image, angle)
+
+        # Blitting is much faster in the display pixel format
+        if pygame.display.get_surface() is not None:
+            rotated = rotated.convert_alpha()
+
+        # Top left corner of the rotated image (centered in the rotated offset)
+        center = self.center_offset.rotate(-angle)
+        rect = rotated.get_rect(center=(center.x, center.y))
+        self.cache[key] = rotated, rect.topleft
+
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+        return self.cache[key]
+
+
+class Pose:
+    """Position and heading of the robot, with the cosine and sine of the heading"""
+
+    __slots__ = ("x", "y", "theta", "cos", "sin")
+
+    def __init__(self, x: float = 0, y: float = 0, theta: float = 0) -> None:
+        self.set(x, y, theta)
+
+    def set(self, x: float, y: float, theta: float) -> None:
+        """Places it, computing the cosine and sine of the heading"""
+
+        self.x, self.y, self.theta = float(x), float(y), float(theta)
+        self.cos, self.sin = math.cos(self.theta), math.sin(self.theta)
+
 
 class VacuumRobot(pygame.sprite.Sprite):
-    """Represents a vacuum robot cleaner"""
+    """Represents a vacuum robot cleaner
+
+    Its current and previous poses are two `Pose` updated in place, with the cosine
+    and sine of the heading only computed when it turns
+    """
 
     def __init__(
         self,
@@ -12,75 +86,96 @@ class VacuumRobot(pygame.sprite.Sprite):
         x: float = 0,
         y: float = 0,
         theta: float = 0,
+        smooth_rotation: bool = False,
+        lidar_beams: int = 360,
+        lidar_range: float = 256,
     ) -> None:
         super().__init__()
         # Robot state
         self.radius = radius
-        self.state = np.array([x, y, theta])
-        self.previous_state = np.array([x, y, theta])
+        self.pose = Pose(x, y, theta)
+        self.previous_pose = Pose(x, y, theta)
+
+        # Sensors
+        self.wall_sensor = WallSensor(radius)
+        self.lidar = Lidar(lidar_beams, lidar_range)
 
         # Pygame
         self.image = image
         self.rect = image.get_rect()
         self.rect.center = (x, y)
+        self.rotated_images = RotatedImages(
+            image, (radius, radius), smooth=smooth_rotation
+        )
+
+    @property
+    def state(self) -> np.array:
+        """Current state (x, y, theta), a copy"""
+
+        pose = self.pose
+        return np.array([pose.x, pose.y, pose.theta])
+
+    @property
+    def previous_state(self) -> np.array:
+        """State before the last move (x, y, theta), a copy"""
+
+        pose = self.previous_pose
+        return np.array([pose.x, pose.y, pose.theta])
 
     def move(self, control: np.array, t_step: float) -> None:
-        """Moves the robot"""
-
-        A = np.array(
-            [
-                [t_step * np.cos(self.state[2]), 0],
-                [-t_step * np.sin(self.state[2]), 0],
-                [0, t_step],
-            ]
-        )
-        self.previous_state = self.state
-        self.state = self.previous_state + A @ control
+        """Moves the robot with the controls (linear and angular velocities) for
+        `t_step` seconds, first forward and then turning"""
 
-        self.rect.center = self.state[:2]
+        linear_velocity, angular_velocity = control.tolist()
 
-    def collided(self) -> None:
-        """Returns to the previous state"""
+        pose, previous = self.pose, self.previous_pose
+        previous.x, previous.y, previous.theta = pose.x, pose.y, pose.theta
+        previous.cos, previous.sin = pose.cos, pose.sin
 
-        self.state = self.previous_state
-        self.rect.center = self.state[:2]
+        # The y axis points down
+        if linear_velocity:
+            pose.x += t_step * pose.cos * linear_velocity
+            pose.y -= t_step * pose.sin * linear_velocity
 
-    def draw(self, surface: pygame.Surface):
-        """Blits the robot to the screen"""
+        if angular_velocity:
+            pose.theta += t_step * angular_velocity
+            pose.cos, pose.sin = math.cos(pose.theta), math.sin(pose.theta)
 
-        self.rotate_and_blit(
-            surface,
-            self.image,
-            (round(self.state[0]), round(self.state[1])),
-            (self.radius, self.radius),
-            np.rad2deg(self.state[2]),
-        )  # Robot
+    def collided(self, impact: float = 0) -> None:
+        """Returns to the previous state, or `impact` of the way from it to the current"""
 
-    def rotate_and_blit(self, surf, image, pos, originPos, angle):
-        """Helper function so a rotated image keeps dimensions"""
+        pose, previous = self.pose, self.previous_pose
+        pose.x = previous.x + impact * (pose.x - previous.x)
+        pose.y = previous.y + impact * (pose.y - previous.y)
 
-        # offset from pivot to center
-        image_rect = image.get_rect(
-            topleft=(pos[0] - originPos[0], pos[1] - originPos[1])
-        )
-        offset_center_to_pivot = pygame.math.Vector2(pos) - image_rect.center
+        theta = previous.theta + impact * (pose.theta - previous.theta)
+        if theta != pose.theta:
+            pose.theta = theta
+            pose.cos, pose.sin = math.cos(theta), math.sin(theta)
 
-        # rotated offset from pivot to center
-        rotated_offset = offset_center_to_pivot.rotate(-angle)
+    def draw(self, surface: pygame.Surface, camera: tuple = (0, 0)) -> pygame.Rect:
+        """Blits the robot to the screen (seen from `camera`), returns the region drawn"""
 
-        # rotated image center
-        rotated_image_center = (pos[0] - rotated_offset.x, pos[1] - rotated_offset.y)
+        pose = self.pose
+        image, (dx, dy) = self.rotated_images.get(math.degrees(pose.theta))
+
+        return surface.blit(
+            image,
+            (
+                round(pose.x) + dx - camera[0],
+                round(pose.y) + dy - camera[1],
+            ),
+        )
 
-        # get a rotated image
-        rotated_image = pygame.transform.rotate(image, angle)
-        rotated_image_rect = rotated_image.get_rect(center=rotated_image_center)
+    def set_state(self, x: float, y: float, theta: float) -> None:
+        """Places the robot (used when replaying a trajectory)"""
 
-        # rotate and blit the image
-        surf.blit(rotated_image, rotated_image_rect)
+        self.pose.set(x, y, theta)
 
     def get_rect(self) -> pygame.Rect:
-        """Getter for the rectangle"""
+        """Getter for the rectangle (centered in the robot)"""
 
+        self.rect.center = (self.pose.x, self.pose.y)
         return self.rect
 
     def get_radius(self) -> float:
@@ -89,6 +184,6 @@ class VacuumRobot(pygame.sprite.Sprite):
         return self.radius
 
     def get_state(self) -> np.array:
-        """Getter for the state"""
+        """Getter for the state (a copy)"""
 
-        return self.state.copy()
+        return self.state
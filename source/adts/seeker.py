@@ -0,0 +1,202 @@
+import math
+
+import numpy as np
+
+from .grid import dilate
+from .planner import get_centers, get_free_grid, get_grid_step, simplify
+
+# Straight moves first, so ties don't zigzag
+MOVES = [(-1, 0), (0, -1), (0, 1), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+def get_dust_field(
+    house,
+    radius: float,
+    robot_length: int,
+    dust_size: tuple,
+    step: int = None,
+    margin: float = 2,
+) -> "DustField":
+    """Dust field of the house dust for a robot of `radius` (and its rectangle of
+    `robot_length`), in a grid of a fifth of the radius by default
+
+    Only the cells further than the radius plus `margin` from the walls are free
+    """
+
+    step = get_grid_step(house, radius) if step is None else step
+    free = get_free_grid(house, step, radius + margin)
+
+    # Offsets from the robot center where dust is vacuumed (its rectangle overlapping
+    # the robot's), a pixel less for the rounding of the center
+    w, h = dust_size
+    reach = (
+        min(robot_length // 2 + w - w // 2, robot_length - robot_length // 2 + w // 2)
+        - 2,
+        min(robot_length // 2 + h - h // 2, robot_length - robot_length // 2 + h // 2)
+        - 2,
+    )
+
+    return DustField(free, step, house.dust, reach)
+
+
+class DustField:
+    """Distance (in grid cells) from the free cells of a grid of the house to the
+    closest ones the robot vacuums some dust from, kept up to date as the dust is
+    vacuumed
+
+    When dust is vacuumed, only the distances that came through its cells are found
+    again, from the cells around them, a ring of cells at a time and at most
+    `max_rings` per `update`, so it never takes long
+    """
+
+    def __init__(self, free: np.array, step: int, spots, reach: tuple) -> None:
+        self.free = free
+        self.step = step
+        self.reach = reach  # Offsets (x, y) from the robot center it vacuums dust at
+
+        # Dust spots vacuumed from each cell
+        self.counts = np.zeros(free.shape, dtype=np.int32)
+        for x, y in spots:
+            self.counts[self.get_zone(x, y)] += 1
+        self.counts[~free] = 0
+
+        # Cells reached from each cell are -1 where no dust can be reached
+        self.distance = np.full(free.shape, -1, dtype=np.int32)
+        self.distance[self.counts > 0] = 0
+        for _ in self.propagate(free & (self.counts == 0)):
+            pass
+
+        self.removed = np.zeros(free.shape, dtype=bool)  # Cells left without dust
+        self.repair = None  # Rings of the distances being found again
+
+    def get_zone(self, x: int, y: int) -> tuple:
+        """Slices of the cells with their centers close enough to vacuum (`x`, `y`)"""
+
+        reach_x, reach_y = self.reach
+        center = (self.step - 1) / 2
+        rows = slice(
+            max(math.ceil((y - reach_y - center) / self.step), 0),
+            max(math.floor((y + reach_y - center) / self.step) + 1, 0),
+        )
+        columns = slice(
+            max(math.ceil((x - reach_x - center) / self.step), 0),
+            max(math.floor((x + reach_x - center) / self.step) + 1, 0),
+        )
+
+        return rows, columns
+
+    def remove(self, x: int, y: int) -> None:
+        """Removes the dust in that spot (its cells are updated by `update`)"""
+
+        zone = self.get_zone(x, y)
+        counts = self.counts[zone]
+        counts -= self.free[zone]
+        self.removed[zone] |= self.free[zone] & (counts == 0)
+
+    def update(self, max_rings: int) -> bool:
+        """Finds the distances of the cells left without dust, up to `max_rings` rings,
+        returns if they are up to date"""
+
+        while max_rings > 0:
+            if self.repair is None:
+                if not self.removed.any():
+                    return True
+                self.repair = self.find_again(self.removed.copy())
+                self.removed[:] = False
+
+            if next(self.repair, None) is None:
+                self.repair = None
+            max_rings -= 1
+
+        return self.repair is None and not self.removed.any()
+
+    def find_again(self, sources: np.array):
+        """Finds again the distances that came through the `sources`, a ring at a time"""
+
+        distance = self.distance
+
+        # Cells further from the sources by a cell each ring, only through them
+        rows, columns = np.nonzero(sources)
+        top, left = int(rows.min()), int(columns.min())
+        frontier = sources[top : rows.max() + 1, left : columns.max() + 1]
+        region = sources.copy()
+        level = 0
+        while frontier.any():
+            yield True
+            grown, window = dilate(frontier, top, left, distance.shape)
+            level += 1
+            frontier = grown & (distance[window] == level) & ~region[window]
+            region[window] |= frontier
+            top, left = window[0].start, window[1].start
+
+        distance[region] = -1
+        yield from self.propagate(region)
+
+    def propagate(self, region: np.array):
+        """Finds the distances of the `region` cells from the ones around them, closest
+        first, a ring at a time"""
+
+        rows, columns = np.nonzero(region)
+        if not len(rows):
+            return
+        window = (
+            slice(max(rows.min() - 1, 0), rows.max() + 2),
+            slice(max(columns.min() - 1, 0), columns.max() + 2),
+        )
+        distance, region = self.distance[window], region[window]
+
+        known = distance[distance >= 0]
+        if not len(known):
+            return
+        level, last = known.min(), known.max()
+        while True:
+            yield True
+            grown, _ = dilate(distance == level, 0, 0, distance.shape)
+            found = grown & region & (distance < 0)
+            if not found.any() and level >= last:
+                break
+
+            level += 1
+            distance[found] = level
+
+    def get_waypoints(self, x: float, y: float, max_cells: int = 64) -> np.array:
+        """Positions to go through from (`x`, `y`) towards the closest dust, up to
+        `max_cells` cells of the way
+
+        Empty if no dust can be reached from around there (yet)
+        """
+
+        # Closest cell around the robot with some dust reachable
+        height, width = self.distance.shape
+        margin = math.ceil(max(self.reach) / self.step)
+        row, column = int(y // self.step), int(x // self.step)
+        top, left = max(row - margin, 0), max(column - margin, 0)
+        window = self.distance[top : row + margin + 1, left : column + margin + 1]
+        cells = np.argwhere(window >= 0)
+        if not len(cells):
+            return np.zeros((0, 2))
+
+        cells += (top, left)
+        centers = get_centers(cells, self.step)
+        row, column = (
+            int(i) for i in cells[np.argmin(np.hypot(*(centers - (x, y)).T))]
+        )
+
+        # Down the distances, keeping the direction while it does
+        distance = self.distance
+        level = int(distance[row, column])
+        path = [(row, column)]
+        move = MOVES[0]
+        while level > 0 and len(path) < max_cells:
+            for dy, dx in [move] + MOVES:
+                r, c = row + dy, column + dx
+                if 0 <= r < height and 0 <= c < width and distance[r, c] == level - 1:
+                    break
+            else:
+                break
+
+            row, column, move = r, c, (dy, dx)
+            level -= 1
+            path.append((row, column))
+
+        return get_centers(np.array(simplify(path)), self.step)
@@ -0,0 +1,191 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def get_probe_offsets(radius: int, n_headings: int) -> tuple[np.array]:
+    """Offsets (x, y) from the robot centre of the back and front probes, per heading
+
+    Each table has shape (`n_headings`, 2 * n_points), back probe points first
+    """
+
+    theta = 2 * np.pi * np.arange(n_headings) / n_headings
+    cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+
+    # Pixels at the right of the robot, starting at its back and front right corners
+    steps = np.arange(-radius, radius // 4)
+    offsets_x = np.hstack(
+        [cos * c + sin * radius + steps * sin for c in (-radius, radius)]
+    )
+    offsets_y = np.hstack(
+        [-sin * c + cos * radius + steps * cos for c in (-radius, radius)]
+    )
+
+    offsets_x.flags.writeable = False
+    offsets_y.flags.writeable = False
+
+    return offsets_x, offsets_y
+
+
+class WallSensor:
+    """Probes at the right side of the robot used to follow walls"""
+
+    def __init__(self, radius: float, n_headings: int = 1024) -> None:
+        self.n_headings = n_headings
+        self.offsets_x, self.offsets_y = get_probe_offsets(int(radius), n_headings)
+        self.n_points = self.offsets_x.shape[1] // 2
+
+        # Furthest a probe point can be from the centre
+        self.reach = int(np.ceil(np.hypot(self.offsets_x, self.offsets_y).max())) + 1
+
+    def read(self, walls: np.array, x: float, y: float, theta: float) -> tuple[bool]:
+        """Checks if the back and front probes are touching a wall"""
+
+        height, width = walls.shape
+        heading = round(theta * self.n_headings / (2 * np.pi)) % self.n_headings
+
+        xs = (self.offsets_x[heading] + x).astype(np.intp)
+        ys = (self.offsets_y[heading] + y).astype(np.intp)
+
+        # Points outside the map never touch a wall
+        if (
+            self.reach <= x < width - self.reach
+            and self.reach <= y < height - self.reach
+        ):
+            touching = walls.ravel().take(ys * width + xs)
+        else:
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            np.clip(xs, 0, width - 1, out=xs)
+            np.clip(ys, 0, height - 1, out=ys)
+            touching = walls.ravel().take(ys * width + xs) & inside
+
+        # Comparing bytes is much cheaper than numpy reductions over so few points
+        touching = touching.tobytes()
+
+        return 1 in touching[: self.n_points], 1 in touching[self.n_points :]
+
+
+class Lidar:
+    """Beams all around the robot measuring the distance to the walls (in pixels)
+
+    The beams are traced through the distance to the walls, jumping as far as it
+    guarantees there is no wall in between, or at least to the next pixel the beam
+    enters, so they stop in the first wall pixel they enter. Beams going along walls
+    only enter a pixel per jump, so after `max_iterations` jumps every pixel the ones
+    still going enter is checked at once instead
+    """
+
+    def __init__(
+        self, n_beams: int = 360, max_range: float = 256, max_iterations: int = 16
+    ) -> None:
+        self.n_beams = n_beams
+        self.max_range = float(max_range)
+        self.max_iterations = max_iterations
+
+        # Counter-clockwise from the front of the robot
+        self.angles = 2 * np.pi * np.arange(n_beams) / n_beams
+        self.ranges = np.zeros(n_beams)
+
+    def scan(self, distance: np.array, x: float, y: float, theta: float) -> np.array:
+        """Ranges of the beams, up to `max_range` (a view valid until the next scan)
+
+        The borders of `distance` (from each pixel to the closest wall) stop the beams
+        like walls
+        """
+
+        height, width = distance.shape
+        angles = self.angles + theta
+        dx, dy = np.cos(angles), -np.sin(angles)  # The y axis points down
+
+        # Beams end at the range or where they leave the grid
+        with np.errstate(divide="ignore"):
+            inverse_x, inverse_y = 1 / dx, 1 / dy
+        ends = np.full(self.n_beams, self.max_range)
+        for p, inverse, size in ((x, inverse_x, width), (y, inverse_y, height)):
+            exits = np.where(inverse > 0, size - 0.5 - p, -0.5 - p) * inverse
+            np.fmin(ends, exits, out=ends)
+
+        # Next pixel border (a half) in the direction of each beam
+        borders_x, borders_y = np.copysign(0.5, dx), np.copysign(0.5, dy)
+        flat = distance.ravel()
+        last_x, last_y = width - 1, height - 1
+
+        t = np.zeros(self.n_beams)  # Distance travelled by each beam
+        for iteration in range(self.max_iterations + 1):
+            px, py = x + t * dx, y + t * dy
+            columns = np.clip(np.floor(px + 0.5), 0, last_x)
+            rows = np.clip(np.floor(py + 0.5), 0, last_y)
+            clearance = flat.take((rows * width + columns).astype(np.intp))
+
+            # Stopped in a wall pixel or at their end
+            going = (clearance > 0) & (t < ends)
+            if not going.any() or iteration == self.max_iterations:
+                break
+
+            entered = np.fmin(
+                (columns + borders_x - px) * inverse_x,
+                (rows + borders_y - py) * inverse_y,
+            )
+            t += np.maximum(clearance - np.sqrt(2), entered + 1e-9) * going
+
+        beams = np.flatnonzero(going)
+        if len(beams):
+            t[beams] = self.trace_pixels(
+                distance,
+                x,
+                y,
+                dx[beams],
+                dy[beams],
+                columns[beams],
+                rows[beams],
+                t[beams],
+                ends[beams],
+            )
+
+        return np.minimum(t, ends, out=self.ranges)
+
+    @staticmethod
+    def trace_pixels(
+        distance: np.array,
+        x: float,
+        y: float,
+        dx: np.array,
+        dy: np.array,
+        columns: np.array,
+        rows: np.array,
+        starts: np.array,
+        ends: np.array,
+    ) -> np.array:
+        """Distances along beams from (`x`, `y`) to the first wall pixel they enter
+        after `starts` (in the pixels (`columns`, `rows`)), `ends` if none
+
+        Every half the beams cross before their ends is checked, all at once
+        """
+
+        height, width = distance.shape
+        steps = np.arange(int(np.ceil((ends - starts).max())) + 1)
+
+        # Halves crossed in each axis, never if the beam is parallel to it
+        crossings = []
+        for p, d, pixels in ((x, dx, columns), (y, dy, rows)):
+            halves = (pixels + np.copysign(0.5, d))[:, None] + np.sign(d)[
+                :, None
+            ] * steps
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossed = (halves - p) / d[:, None]
+            crossed[~np.isfinite(crossed)] = np.inf
+            crossings.append(crossed)
+        crossings = np.sort(np.concatenate(crossings, axis=1), axis=1) + 1e-9
+
+        # Pixels entered at each crossing (up to the end, the ones after are ignored)
+        reached = np.minimum(crossings, ends[:, None])
+        columns = np.clip(np.floor(x + reached * dx[:, None] + 0.5), 0, width - 1)
+        rows = np.clip(np.floor(y + reached * dy[:, None] + 0.5), 0, height - 1)
+        walls = distance.ravel().take((rows * width + columns).astype(np.intp)) <= 0
+        walls &= crossings < ends[:, None]
+
+        first = walls.argmax(axis=1)
+        return np.where(
+            walls.any(axis=1), crossings[np.arange(len(first)), first], ends
+        )
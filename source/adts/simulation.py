@@ -0,0 +1,214 @@
+import numpy as np
+import pygame
+
+from .house import House
+from .robot import VacuumRobot
+from .controller import Controller
+from .planner import get_plan
+from .seeker import get_dust_field
+from .profiler import FrameProfiler, Phase
+from .trajectory import TrajectoryRecorder
+
+
+class Simulation:
+    """Steps a robot cleaning a house, without any display, sound or real time pacing"""
+
+    def __init__(
+        self,
+        house: House,
+        mode: str,
+        n_dust: int,
+        robot_length: int,
+        dust_size: tuple,
+        linear_velocity: float,
+        angular_velocity: float,
+        frequency: int,
+        robot_image: pygame.Surface = None,
+        smooth_rotation: bool = False,
+        rotate_percent: float = 0.01,
+        max_rings: int = 8,
+    ) -> None:
+        self.house = house
+        self.frequency = frequency
+        self.controller = Controller(
+            linear_velocity, angular_velocity, mode, frequency, rotate_percent
+        )
+
+        # Without a display the image is only used for its rectangle
+        if robot_image is None:
+            robot_image = pygame.Surface((robot_length, robot_length))
+
+        # Get a valid starting position for the robot
+        robot_pos = house.get_free_spot(robot_length // 2)
+        self.robot = VacuumRobot(
+            robot_image, robot_length // 2, *robot_pos, smooth_rotation=smooth_rotation
+        )
+
+        # The plan is computed once per map, only the way to it depends on the start
+        if mode == "planned":
+            plan = get_plan(house, self.robot.get_radius())
+            self.controller.set_waypoints(plan.get_waypoints(*robot_pos))
+
+        # Dust can't overlap the walls (half of its diagonal away from them)
+        dust_clearance = np.hypot(*dust_size) / 2
+
+        for _ in range(n_dust):
+            house.dirty(*house.get_free_spot(dust_clearance))
+
+        # Cells covered after each step (the buffer doubles when full), the floor is
+        # only covered while vacuuming
+        house.reset_coverage()
+        self.covered = np.zeros(1 << 12, dtype=np.int64)
+
+        # Dust is vacuumed when its rectangle (centered in it) overlaps the robot's
+        self.dust_size = dust_size
+        self.vacuumed = []  # Dust spots vacuumed in the last step
+
+        # The way to the closest dust is kept up to date as it is vacuumed, updating
+        # at most `max_rings` rings of the grid per step
+        self.dust_field = None
+        self.max_rings = max_rings
+        if mode == "seek":
+            self.dust_field = get_dust_field(
+                house, self.robot.get_radius(), robot_length, dust_size
+            )
+            self.seek(False)
+
+        self.n_dust = n_dust
+        self.n_steps = 0
+        self.n_collisions = 0
+        self.time = 0.0  # Simulated seconds
+
+        self.profiler: FrameProfiler = None  # Optional timing of each phase
+        self.recorder: TrajectoryRecorder = None  # Optional recording of each step
+
+    def step(self, keys: list = None) -> tuple[bool]:
+        """Advances the simulation one time step, returns if it vacuumed and collided"""
+
+        robot = self.robot
+        profiler = self.profiler
+
+        back_lidar, front_lidar = self.house.get_wall_readings(robot)
+        if profiler is not None:
+            profiler.lap(Phase.SENSORS)
+
+        controls, vacuuming = self.controller.get_controls(
+            keys, back_lidar, front_lidar, robot
+        )
+        if profiler is not None:
+            profiler.lap(Phase.CONTROLLER)
+
+        robot.move(controls, 1 / self.frequency)
+        if profiler is not None:
+            profiler.lap(Phase.MOVE)
+
+        # Hit a wall or left the house limits on the way, stopping where it touched
+        pose, previous = robot.pose, robot.previous_pose
+        impact, _ = self.house.get_impact(
+            previous.x, previous.y, pose.x, pose.y, robot.get_radius()
+        )
+        collided = impact < 1
+        if collided:
+            self.controller.collide()
+            robot.collided(impact)
+            self.n_collisions += 1
+        if profiler is not None:
+            profiler.lap(Phase.COLLISION)
+
+        # Vacuum
+        self.vacuumed = []
+        if vacuuming:
+            w, h = self.dust_size
+            rect = robot.get_rect()
+            self.vacuumed = self.house.dust.find(
+                rect.left - (w - w // 2) + 1,
+                rect.top - (h - h // 2) + 1,
+                rect.right + w // 2,
+                rect.bottom + h // 2,
+            )
+            for d in self.vacuumed:
+                self.house.clean(*d)
+        if profiler is not None:
+            profiler.lap(Phase.VACUUM)
+
+        if self.dust_field is not None:
+            self.seek(collided)
+
+        # Coverage
+        if vacuuming:
+            self.house.cover(previous.x, previous.y, pose.x, pose.y, robot.get_radius())
+        if self.n_steps == len(self.covered):
+            self.covered = np.concatenate((self.covered, np.zeros_like(self.covered)))
+        self.covered[self.n_steps] = self.house.coverage.n_covered
+        if profiler is not None:
+            profiler.lap(Phase.COVERAGE)
+
+        self.n_steps += 1
+        self.time += 1 / self.frequency
+
+        if self.recorder is not None:
+            self.recorder.record(vacuuming, collided)
+
+        return vacuuming, collided
+
+    def seek(self, collided: bool) -> None:
+        """Updates the dust field and gives the controller the way to the closest dust,
+        when the robot vacuumed some, hit a wall or reached the last waypoint"""
+
+        field, controller, robot = self.dust_field, self.controller, self.robot
+
+        for d in self.vacuumed:
+            field.remove(*d)
+        updated = field.update(self.max_rings)
+
+        if controller.seeking and (
+            self.vacuumed
+            or collided
+            or controller.waypoint >= len(controller.waypoints)
+        ):
+            waypoints = field.get_waypoints(robot.pose.x, robot.pose.y)
+            if len(waypoints):
+                controller.set_waypoints(waypoints)
+
+            # The dust left can't be reached, look for it following the walls
+            elif updated:
+                controller.stop_seeking()
+
+    def run_until_clean(self, max_steps: int = None) -> bool:
+        """Steps until all dust is cleaned or `max_steps` were done, returns if it is clean"""
+
+        steps = 0
+        while not self.is_clean():
+            if max_steps is not None and steps >= max_steps:
+                return False
+
+            self.step()
+            steps += 1
+
+        return True
+
+    def is_clean(self) -> bool:
+        """Checks if all the dust was vacuumed"""
+
+        return not self.house.dust
+
+    def get_cleaned_percent(self) -> float:
+        """Getter for the percentage of dust vacuumed"""
+
+        if not self.n_dust:
+            return 100.0
+
+        return 100 * (self.n_dust - len(self.house.dust)) / self.n_dust
+
+    def get_coverage_curve(self) -> tuple[np.array]:
+        """Getter for the simulated times and the percentage of the house covered then"""
+
+        times = np.arange(1, self.n_steps + 1) / self.frequency
+        covered = self.covered[: self.n_steps].astype(float)
+
+        return times, 100 * covered / max(self.house.interior_size, 1)
+
+    def get_time(self) -> float:
+        """Getter for the simulated time in seconds"""
+
+        return self.time
@@ -0,0 +1,203 @@
+import numpy as np
+
+
+def get_overlaps(
+    left: int, top: int, right: int, bottom: int, width: int, height: int, size: int
+):
+    """Tiles of `size` of a `width` x `height` grid overlapping a region (right and
+    bottom excluded)
+
+    Yields their (row, column) and the slices of the overlap in the region and in
+    the tile
+    """
+
+    bottom, right = min(bottom, height), min(right, width)
+    if max(top, 0) >= bottom or max(left, 0) >= right:
+        return
+
+    for row in range(max(top, 0) // size, (bottom - 1) // size + 1):
+        y0, y1 = max(top, row * size), min(bottom, (row + 1) * size)
+        for column in range(max(left, 0) // size, (right - 1) // size + 1):
+            x0, x1 = max(left, column * size), min(right, (column + 1) * size)
+            yield (
+                row,
+                column,
+                (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left)),
+                (
+                    slice(y0 - row * size, y1 - row * size),
+                    slice(x0 - column * size, x1 - column * size),
+                ),
+            )
+
+
+class BitTiles:
+    """Bool grid stored in square bit-packed tiles, only allocated once set
+
+    Tiles are indexed by their (row, column), each one has `tile_size` rows of
+    `tile_size` bits, packed by `np.packbits`. Missing tiles are all `False`
+    """
+
+    def __init__(self, width: int, height: int, tile_size: int = 256) -> None:
+        if tile_size % 8:
+            raise ValueError("The tile size must be a multiple of 8")
+
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tiles = {}  # (row, column) -> packed tile
+
+    @classmethod
+    def from_array(cls, grid: np.array, tile_size: int = 256) -> "BitTiles":
+        """Tiles of a dense bool grid"""
+
+        tiles = cls(grid.shape[1], grid.shape[0], tile_size)
+        tiles.set_array(0, 0, grid)
+
+        return tiles
+
+    @classmethod
+    def from_packed_rows(
+        cls, rows: np.array, width: int, tile_size: int = 256
+    ) -> "BitTiles":
+        """Tiles of a grid with each row bit-packed (as saved in map files)
+
+        Only the tiles with some bit set are copied, so `rows` can be memory-mapped
+        """
+
+        tiles = cls(width, rows.shape[0], tile_size)
+        packed = tile_size // 8
+
+        for top in range(0, tiles.height, tile_size):
+            strip = rows[top : top + tile_size]
+            for left in range(0, strip.shape[1], packed):
+                block = strip[:, left : left + packed]
+                if block.any():
+                    tile = np.zeros((tile_size, packed), dtype=np.uint8)
+                    tile[: block.shape[0], : block.shape[1]] = block
+                    tiles.tiles[(top // tile_size, left // packed)] = tile
+
+        return tiles
+
+    def get_tile(self, row: int, column: int) -> np.array:
+        """Unpacked tile, `None` if it has no bits set"""
+
+        tile = self.tiles.get((row, column))
+        if tile is None:
+            return None
+
+        return np.unpackbits(tile, axis=1).view(bool)
+
+    def set_tile(self, row: int, column: int, tile: np.array) -> None:
+        """Packs an unpacked tile, freeing it if it has no bits set"""
+
+        if tile.any():
+            self.tiles[(row, column)] = np.packbits(tile, axis=1)
+        else:
+            self.tiles.pop((row, column), None)
+
+    def get_array(self, left: int, top: int, right: int, bottom: int) -> np.array:
+        """Dense copy of a region (right and bottom excluded), `False` outside the grid"""
+
+        region = np.full((bottom - top, right - left), False)
+
+        for row, column, inside, part in get_overlaps(
+            left, top, right, bottom, self.width, self.height, self.tile_size
+        ):
+            tile = self.get_tile(row, column)
+            if tile is not None:
+                region[inside] = tile[part]
+
+        return region
+
+    def set_array(self, left: int, top: int, values: np.array) -> None:
+        """Overwrites a region, starting at (`left`, `top`), with `values`"""
+
+        size = self.tile_size
+        bottom, right = top + values.shape[0], left + values.shape[1]
+
+        for row, column, inside, part in get_overlaps(
+            left, top, right, bottom, self.width, self.height, size
+        ):
+            tile = self.get_tile(row, column)
+            if tile is None:
+                tile = np.full((size, size), False)
+
+            tile[part] = values[inside]
+            self.set_tile(row, column, tile)
+
+    def set_points(self, xs: np.array, ys: np.array) -> None:
+        """Sets the cells at (`xs`, `ys`), points outside the grid are ignored"""
+
+        xs, ys = np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys = xs[inside], ys[inside]
+
+        size = self.tile_size
+        keys = (ys // size) * (-(-self.width // size)) + xs // size
+        order = np.argsort(keys, kind="stable")
+        keys, xs, ys = keys[order], xs[order], ys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+
+        for start, end in zip(
+            np.concatenate(([0], bounds)), np.concatenate((bounds, [len(keys)]))
+        ):
+            if start == end:
+                continue
+
+            row, column = ys[start] // size, xs[start] // size
+            tile = self.get_tile(row, column)
+            if tile is None:
+                tile = np.full((size, size), False)
+
+            tile[ys[start:end] - row * size, xs[start:end] - column * size] = True
+            self.set_tile(row, column, tile)
+
+    def get_packed_rows(self, top: int, bottom: int) -> np.array:
+        """Rows from `top` to `bottom` (excluded), each one bit-packed"""
+
+        size = self.tile_size
+        packed = size // 8
+        rows = np.zeros((bottom - top, -(-self.width // 8)), dtype=np.uint8)
+
+        for (row, column), tile in self.tiles.items():
+            y0, y1 = max(top, row * size), min(bottom, (row + 1) * size)
+            if y0 >= y1:
+                continue
+
+            x0 = column * packed
+            x1 = min(x0 + packed, rows.shape[1])
+            rows[y0 - top : y1 - top, x0:x1] = tile[
+                y0 - row * size : y1 - row * size, : x1 - x0
+            ]
+
+        return rows
+
+    def get_bounds(self) -> tuple[int]:
+        """Smallest and biggest x and y of the set cells, `None` if there are none"""
+
+        if not self.tiles:
+            return None
+
+        size = self.tile_size
+        min_x = min_y = np.inf
+        max_x = max_y = -np.inf
+        for row, column in self.tiles:
+            tile = self.get_tile(row, column)
+            columns = np.flatnonzero(tile.any(axis=0)) + column * size
+            rows = np.flatnonzero(tile.any(axis=1)) + row * size
+
+            min_x, max_x = min(min_x, columns[0]), max(max_x, columns[-1])
+            min_y, max_y = min(min_y, rows[0]), max(max_y, rows[-1])
+
+        return int(min_x), int(max_x), int(min_y), int(max_y)
+
+    def any(self, left: int, top: int, right: int, bottom: int) -> bool:
+        """Checks if any cell of a region (right and bottom excluded) is set"""
+
+        for row, column, _, _ in get_overlaps(
+            left, top, right, bottom, self.width, self.height, self.tile_size
+        ):
+            if (row, column) in self.tiles:
+                return bool(self.get_array(left, top, right, bottom).any())
+
+        return False
@@ -0,0 +1,225 @@
+import json
+
+import numpy as np
+
+from .map_file import write_rows
+from .tiles import BitTiles
+
+MAGIC = b"VRTRAJ02"
+COUNTS_DTYPE = np.dtype([("n_steps", "<u8"), ("n_pickups", "<u8")])
+STEP_DTYPE = np.dtype(
+    [
+        ("x", "<f4"),
+        ("y", "<f4"),
+        ("theta", "<f4"),
+        ("linear", "<f4"),  # Controls
+        ("angular", "<f4"),
+        ("vacuum", "u1"),
+        ("collided", "u1"),
+        # Controller states, see `controller.State` and `controller.WallState`
+        ("state", "u1"),
+        ("wall_state", "u1"),
+        ("n_pickups", "<u2"),  # Dust vacuumed in the step
+    ]
+)
+PICKUP_DTYPE = np.dtype([("step", "<i4"), ("dust", "<i4")])
+
+ALIGNMENT = 64
+HEADER_SIZE = 4096  # Room for the JSON header
+
+
+def align(offset: int) -> int:
+    """Rounds `offset` up to the sections alignment"""
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class TrajectoryRecorder:
+    """Appends the state of every step of a simulation to a binary trajectory file
+
+    The file has the magic, the counts of steps and pickups, a JSON header (map size,
+    seed and parameters) and the sections: walls rows bit-packed, dust spots, dust
+    pickups and steps (preallocated and grown when full)
+    """
+
+    def __init__(
+        self, path: str, simulation, metadata: dict = None, capacity: int = 1 << 16
+    ) -> None:
+        house = simulation.house
+        self.simulation = simulation
+        self.dust_ids = {d: i for i, d in enumerate(house.dust)}
+
+        sections = {
+            "walls": house.heigth * -(-house.width // 8),  # Rows bit-packed
+            "dust": len(self.dust_ids) * 2 * 4,
+            "pickups": len(self.dust_ids) * PICKUP_DTYPE.itemsize,
+        }
+        # The metadata can't replace the keys replays depend on
+        header = {
+            **(metadata or {}),
+            "width": house.width,
+            "height": house.heigth,
+            "n_dust": len(self.dust_ids),
+            "frequency": simulation.frequency,
+            "radius": simulation.robot.get_radius(),
+            "dust_size": list(simulation.dust_size),
+            "mode": simulation.controller.mode,
+        }
+
+        # Sections offsets, after the room for the header
+        offset = align(len(MAGIC) + COUNTS_DTYPE.itemsize + 4 + HEADER_SIZE)
+        header["sections"] = {}
+        for name, size in sections.items():
+            header["sections"][name] = offset
+            offset = align(offset + size)
+        header["sections"]["steps"] = offset
+
+        encoded = json.dumps(header).encode()
+        if len(encoded) > HEADER_SIZE:
+            raise ValueError("Trajectory header is too big")
+
+        self.path = path
+        self.steps_offset = offset
+        self.capacity = capacity
+        self.n_steps = 0
+        self.n_pickups = 0
+
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.zeros(1, COUNTS_DTYPE).tobytes())
+            f.write(np.uint32(len(encoded)).tobytes())
+            f.write(encoded)
+
+            f.seek(header["sections"]["walls"])
+            write_rows(f, house.walls)
+
+            f.seek(header["sections"]["dust"])
+            f.write(np.array(list(self.dust_ids), dtype="<i4").tobytes())
+
+            f.seek(header["sections"]["pickups"])
+            f.write(np.full(len(self.dust_ids), -1, PICKUP_DTYPE).tobytes())
+
+            f.truncate(self.steps_offset + capacity * STEP_DTYPE.itemsize)
+
+        # Counts are kept up to date, so an interrupted recording can still be read
+        self.counts = np.memmap(path, COUNTS_DTYPE, "r+", len(MAGIC), (1,))
+        self.pickups = np.memmap(
+            path,
+            PICKUP_DTYPE,
+            "r+",
+            header["sections"]["pickups"],
+            (len(self.dust_ids),),
+        )
+        self.open_steps()
+
+        # First step is the initial state
+        self.record(False, False)
+
+    def open_steps(self) -> None:
+        """Maps the steps section of the file"""
+
+        self.steps = np.memmap(
+            self.path, STEP_DTYPE, "r+", self.steps_offset, (self.capacity,)
+        )
+
+    def record(self, vacuuming: bool, collided: bool) -> None:
+        """Appends the current state of the simulation"""
+
+        if self.n_steps == self.capacity:
+            self.steps.flush()
+            del self.steps
+            self.capacity *= 2
+            with open(self.path, "r+b") as f:
+                f.truncate(self.steps_offset + self.capacity * STEP_DTYPE.itemsize)
+            self.open_steps()
+
+        simulation = self.simulation
+        controller = simulation.controller
+        pose = simulation.robot.pose
+        linear, angular = controller.controls
+
+        self.steps[self.n_steps] = (
+            pose.x,
+            pose.y,
+            pose.theta,
+            linear,
+            angular,
+            vacuuming,
+            collided,
+            controller.state,
+            controller.wall_state,
+            len(simulation.vacuumed),
+        )
+
+        for d in simulation.vacuumed:
+            self.pickups[self.n_pickups] = (self.n_steps, self.dust_ids[d])
+            self.n_pickups += 1
+
+        self.n_steps += 1
+        self.counts[0] = (self.n_steps, self.n_pickups)
+
+    def close(self) -> None:
+        """Saves the file and trims the unused steps"""
+
+        for mapped in (self.counts, self.pickups, self.steps):
+            mapped.flush()
+        del self.counts, self.pickups, self.steps
+
+        with open(self.path, "r+b") as f:
+            f.truncate(self.steps_offset + self.n_steps * STEP_DTYPE.itemsize)
+
+
+class Trajectory:
+    """A recorded trajectory, memory-mapped for random access to any step"""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+
+            counts = np.frombuffer(f.read(COUNTS_DTYPE.itemsize), COUNTS_DTYPE)[0]
+            length = int(np.frombuffer(f.read(4), np.uint32)[0])
+            self.header = json.loads(f.read(length))
+
+        self.n_steps = int(counts["n_steps"])
+        self.n_pickups = int(counts["n_pickups"])
+        sections = self.header["sections"]
+
+        self.width = self.header["width"]
+        self.height = self.header["height"]
+        n_dust = self.header["n_dust"]
+
+        rows = np.memmap(
+            path, np.uint8, "r", sections["walls"], (self.height, -(-self.width // 8))
+        )
+        self.walls = BitTiles.from_packed_rows(rows, self.width)
+
+        self.dust = np.memmap(path, "<i4", "r", sections["dust"], (n_dust, 2))
+        self.pickups = np.memmap(
+            path, PICKUP_DTYPE, "r", sections["pickups"], (self.n_pickups,)
+        )
+
+        self.steps = np.memmap(
+            path, STEP_DTYPE, "r", sections["steps"], (self.n_steps,)
+        )
+
+    def get_remaining_dust(self, step: int) -> np.array:
+        """Mask of the dust not vacuumed yet after `step`"""
+
+        remaining = np.full(len(self.dust), True)
+        n = np.searchsorted(self.pickups["step"], step, side="right")
+        remaining[self.pickups["dust"][:n]] = False
+
+        return remaining
+
+    def get_pickups(self, start: int, end: int) -> np.array:
+        """Dust vacuumed after `start` until `end` (included)"""
+
+        first, last = np.searchsorted(self.pickups["step"], [start, end], side="right")
+
+        return self.pickups["dust"][first:last]
+
+    def __len__(self) -> int:
+        """Number of steps"""
+
+        return self.n_steps
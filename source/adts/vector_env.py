@@ -0,0 +1,405 @@
+import math
+
+import numpy as np
+
+from .sensors import WallSensor
+
+# Columns of the observations
+OBSERVATIONS = ("x", "y", "theta", "back_lidar", "front_lidar", "collided")
+
+
+class VectorEnv:
+    """Independent robots cleaning houses, all stepped at once (Gym style `reset` and
+    `step` over the batch)
+
+    The state of every environment is kept in arrays (struct of arrays) and the houses
+    in dense grids of their walls and distances to them, stacked, so a step is the same
+    few numpy operations whatever the number of environments. Environments given the
+    same `House` share its grids
+    """
+
+    def __init__(
+        self,
+        houses: list,
+        n_dust: int,
+        robot_length: int,
+        dust_size: tuple,
+        linear_velocity: float,
+        angular_velocity: float,
+        frequency: int,
+        max_steps: int = None,
+        precision: float = 0.1,
+    ) -> None:
+        if n_dust < 1:
+            raise ValueError("There must be some dust to vacuum")
+
+        self.n_envs = len(houses)
+        self.n_dust = n_dust
+        self.robot_length = robot_length
+        self.radius = robot_length // 2
+        self.dust_size = dust_size
+        self.linear_velocity = float(linear_velocity)
+        self.angular_velocity = float(angular_velocity)
+        self.frequency = frequency
+        self.max_steps = max_steps  # Steps until an episode is truncated (None never)
+        self.precision = precision  # Pixels, of the contact with the walls
+
+        # Houses of the environments, once each
+        self.houses = []
+        maps = {}
+        for house in houses:
+            if id(house) not in maps:
+                maps[id(house)] = len(self.houses)
+                self.houses.append(house)
+        self.maps = np.array([maps[id(house)] for house in houses], dtype=np.intp)
+
+        # Grids of the houses padded so the probes never leave them
+        self.sensor = WallSensor(self.radius)
+        pad = self.pad = self.sensor.reach
+        width = max(house.width for house in self.houses)
+        height = max(house.heigth for house in self.houses)
+        self.stride = width + 2 * pad
+        size = (height + 2 * pad) * self.stride
+        self.walls = np.zeros(len(self.houses) * size, dtype=np.uint8)
+        self.distance = np.zeros(len(self.houses) * size, dtype=np.float32)
+        for i, house in enumerate(self.houses):
+            walls = self.walls[i * size : (i + 1) * size].reshape(-1, self.stride)
+            distance = self.distance[i * size : (i + 1) * size].reshape(-1, self.stride)
+            inside = (
+                slice(pad, pad + house.heigth),
+                slice(pad, pad + house.width),
+            )
+            walls[inside] = house.walls.get_array(0, 0, house.width, house.heigth)
+            distance[inside] = house.get_distance_array(0, 0, house.width, house.heigth)
+
+        # Flat index of the (0, 0) pixel of the house of each environment
+        self.origins = self.maps * size + pad * self.stride + pad
+        self.min_x = self.min_y = -pad
+        self.max_x, self.max_y = width + pad - 1, height + pad - 1
+
+        self.widths = np.array([h.width for h in houses], dtype=float)
+        self.heights = np.array([h.heigth for h in houses], dtype=float)
+
+        # Free cells (flat indexes) of each house to draw robots and dust from
+        dust_clearance = np.hypot(*dust_size) / 2
+        self.robot_cells = [h.get_free_cells(self.radius) for h in self.houses]
+        self.dust_cells = [h.get_free_cells(dust_clearance) for h in self.houses]
+        for cells in self.robot_cells:
+            if not len(cells):
+                raise ValueError(
+                    f"No free spot inside the house with clearance {self.radius}"
+                )
+
+        ##### State #####
+        n = self.n_envs
+        self.x, self.y, self.theta = np.zeros(n), np.zeros(n), np.zeros(n)
+        self.cos, self.sin = np.ones(n), np.zeros(n)
+        self.previous_x, self.previous_y = np.zeros(n), np.zeros(n)
+        self.previous_theta = np.zeros(n)
+        self.collided = np.zeros(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int64)
+
+        # Dust spots of each environment and the ones not vacuumed yet
+        self.dust_x = np.zeros((n, n_dust), dtype=np.int64)
+        self.dust_y = np.zeros((n, n_dust), dtype=np.int64)
+        self.dust = np.zeros((n, n_dust), dtype=bool)
+        self.dust_left = np.zeros(n, dtype=np.int64)
+
+        ##### Outputs (overwritten every step) #####
+        self.observations = np.zeros((n, len(OBSERVATIONS)), dtype=np.float32)
+        self.rewards = np.zeros(n, dtype=np.float32)
+        self.terminated = np.zeros(n, dtype=bool)
+        self.truncated = np.zeros(n, dtype=bool)
+
+        ##### Scratch (reused every step) #####
+        self.linear, self.angular = np.zeros(n), np.zeros(n)  # Clipped actions
+        self.motion = np.zeros(n)
+        self.left, self.top = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+        self.differences = np.zeros((n, n_dust), dtype=np.int64)
+        self.vacuumed = np.zeros((n, n_dust), dtype=bool)
+        self.in_y = np.zeros((n, n_dust), dtype=bool)
+        self.dx, self.dy, self.length = np.zeros(n), np.zeros(n), np.zeros(n)
+        self.impact, self.free, self.t = np.zeros(n), np.zeros(n), np.zeros(n)
+        self.envs = np.arange(n)
+        self.angles = np.zeros(n)
+        self.headings = np.zeros(n, dtype=np.intp)
+        probes = (n, self.sensor.offsets_x.shape[1])
+        self.probes, self.offsets = np.zeros(probes), np.zeros(probes)
+        self.columns = np.zeros(probes, dtype=np.intp)
+        self.indexes = np.zeros(probes, dtype=np.intp)
+        self.touching = np.zeros(probes, dtype=np.uint8)
+        self.back, self.front = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+        self.rng = np.random.default_rng()
+
+    def reset(self, seed: int = None) -> np.array:
+        """Starts a new episode in every environment, returns the observations"""
+
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        self.reset_envs(np.arange(self.n_envs))
+        self.observe()
+
+        return self.observations
+
+    def reset_envs(self, envs: np.array) -> None:
+        """Places the robots of `envs` in free spots and spreads new dust"""
+
+        for i in np.unique(self.maps[envs]).tolist():
+            group = envs[self.maps[envs] == i]
+            width = self.houses[i].width
+
+            robot_cells = self.robot_cells[i]
+            spots = robot_cells[self.rng.integers(len(robot_cells), size=len(group))]
+            self.y[group], self.x[group] = np.divmod(spots, width)
+
+            spots = self.get_dust_spots(self.dust_cells[i], len(group))
+            self.dust_y[group], self.dust_x[group] = np.divmod(spots, width)
+
+        self.theta[envs] = 0
+        self.cos[envs], self.sin[envs] = 1, 0
+        self.collided[envs] = False
+        self.steps[envs] = 0
+        self.dust[envs] = True
+        self.dust_left[envs] = self.n_dust
+
+    def get_dust_spots(self, cells: np.array, n: int) -> np.array:
+        """Draws `n` rows of `n_dust` different cells"""
+
+        if len(cells) < self.n_dust:
+            raise ValueError(f"Only {len(cells)} free spots for {self.n_dust} dust")
+        spots = np.sort(self.rng.integers(len(cells), size=(n, self.n_dust)), axis=1)
+
+        # The same spot twice is drawn again, while they are repeated
+        repeated = np.zeros(spots.shape, dtype=bool)
+        while True:
+            np.equal(spots[:, 1:], spots[:, :-1], out=repeated[:, 1:])
+            if not repeated.any():
+                break
+            spots[repeated] = self.rng.integers(len(cells), size=repeated.sum())
+            spots.sort(axis=1)
+
+        return cells[spots]
+
+    def step(self, actions: np.array) -> tuple:
+        """Moves every robot with its action (linear and angular velocities) for a time
+        step, vacuuming the dust it passes over
+
+        Returns the observations, the rewards (dust vacuumed), if the episodes ended
+        (all dust vacuumed) or were truncated (after `max_steps`) and an info dict. The
+        environments that finished start a new episode, their observations are of it
+        """
+
+        actions = np.asarray(actions, dtype=float)
+        v, w = self.linear_velocity, self.angular_velocity
+        linear = np.clip(actions[:, 0], -v, v, out=self.linear)
+        angular = np.clip(actions[:, 1], -w, w, out=self.angular)
+        t_step = 1 / self.frequency
+
+        # Forward and then turning (the y axis points down)
+        np.copyto(self.previous_x, self.x)
+        np.copyto(self.previous_y, self.y)
+        np.copyto(self.previous_theta, self.theta)
+        motion = self.motion
+        np.multiply(self.cos, t_step, out=motion)
+        motion *= linear
+        self.x += motion
+        np.multiply(self.sin, t_step, out=motion)
+        motion *= linear
+        self.y -= motion
+        np.multiply(angular, t_step, out=motion)
+        self.theta += motion
+
+        # Hit a wall or left the house limits on the way, stopping where it touched
+        impact = self.get_impacts()
+        np.less(impact, 1, out=self.collided)
+        collided = np.flatnonzero(self.collided)
+        if len(collided):
+            impact = impact[collided]
+            for state, previous in (
+                (self.x, self.previous_x),
+                (self.y, self.previous_y),
+                (self.theta, self.previous_theta),
+            ):
+                state[collided] = previous[collided] + impact * (
+                    state[collided] - previous[collided]
+                )
+        np.cos(self.theta, out=self.cos)
+        np.sin(self.theta, out=self.sin)
+
+        # Dust is vacuumed when its rectangle (centered in it) overlaps the robot's
+        w, h = self.dust_size
+        length = self.robot_length
+        for start, position, offset in (
+            (self.left, self.x, length // 2 + (w - w // 2) - 1),
+            (self.top, self.y, length // 2 + (h - h // 2) - 1),
+        ):
+            np.add(position, 0.5, out=motion)
+            np.floor(motion, out=motion)
+            np.copyto(start, motion, casting="unsafe")
+            start -= offset
+        vacuumed = self.in_range(
+            self.dust_x, self.left, length + w - 1, self.differences, self.vacuumed
+        )
+        vacuumed &= self.in_range(
+            self.dust_y, self.top, length + h - 1, self.differences, self.in_y
+        )
+        vacuumed &= self.dust
+        self.dust ^= vacuumed  # Only where there was dust
+        np.sum(vacuumed, axis=1, out=self.rewards)
+        np.subtract(self.dust_left, self.rewards, out=self.dust_left, casting="unsafe")
+
+        self.steps += 1
+        np.equal(self.dust_left, 0, out=self.terminated)
+        if self.max_steps is not None:
+            np.greater_equal(self.steps, self.max_steps, out=self.truncated)
+
+        done = np.flatnonzero(self.terminated | self.truncated)
+        if len(done):
+            self.reset_envs(done)
+
+        self.observe()
+
+        return self.observations, self.rewards, self.terminated, self.truncated, {}
+
+    @staticmethod
+    def in_range(
+        values: np.array,
+        starts: np.array,
+        length: int,
+        differences: np.array,
+        out: np.array,
+    ) -> np.array:
+        """Checks if the values of each row are in [`starts`, `starts` + `length`),
+        into `out` (`differences` is scratch of the shape of `values`)"""
+
+        # Values below the start wrap around to big unsigned ones
+        np.subtract(values, starts[:, None], out=differences)
+        return np.less(differences.view(np.uint64), length, out=out)
+
+    def get_clearance(self, envs: np.array, x: np.array, y: np.array) -> np.array:
+        """Returns how far the robots of `envs` in (`x`, `y`) are from touching a wall
+        or the house limits (not positive if they touch them)"""
+
+        columns = np.clip(np.rint(x), self.min_x, self.max_x).astype(np.intp)
+        rows = np.clip(np.rint(y), self.min_y, self.max_y).astype(np.intp)
+        distance = self.distance.take(self.origins[envs] + rows * self.stride + columns)
+
+        r = self.radius
+        clearance = distance - r
+        np.minimum(clearance, x - r, out=clearance)
+        np.minimum(clearance, y - r, out=clearance)
+        np.minimum(clearance, self.widths[envs] - x - r, out=clearance)
+        np.minimum(clearance, self.heights[envs] - y - r, out=clearance)
+
+        return clearance
+
+    def get_impacts(self) -> np.array:
+        """Fractions of their last step the robots can move without touching a wall or
+        the house limits (1 if they never do)
+
+        Like `House.get_impact`, each robot advances as far as its clearance guarantees
+        it doesn't touch anything, or at least to the next pixel its center enters,
+        and the contact is then found up to `precision` pixels
+        """
+
+        x0, y0 = self.previous_x, self.previous_y
+        dx = np.subtract(self.x, x0, out=self.dx)
+        dy = np.subtract(self.y, y0, out=self.dy)
+        length = np.hypot(dx, dy, out=self.length)
+
+        impact = self.impact
+        impact.fill(1)
+        free = self.free  # Last fraction known to be free
+        free.fill(0)
+        t = self.t  # Next one checked
+        t.fill(0)
+
+        # Robots still moving (only these are indexed, in smaller arrays)
+        envs = self.envs
+        while len(envs):
+            tx, ty = x0[envs] + t[envs] * dx[envs], y0[envs] + t[envs] * dy[envs]
+            clearance = self.get_clearance(envs, tx, ty)
+            touching = clearance <= 0
+            free[envs[~touching]] = t[envs[~touching]]
+
+            safe = (clearance - math.sqrt(2)) - (1 - t[envs]) * length[envs]
+            moving = ~touching & (t[envs] < 1) & (safe < 0) & (length[envs] > 0)
+            impact[envs[touching]] = 0  # Found below
+
+            # Pixels are entered when a coordinate crosses a half
+            envs, safe, tx, ty = envs[moving], safe[moving], tx[moving], ty[moving]
+            entered = self.get_crossings(tx, x0[envs], dx[envs])
+            np.minimum(entered, self.get_crossings(ty, y0[envs], dy[envs]), out=entered)
+            t[envs] = np.minimum(
+                np.maximum(1 + safe / length[envs], entered + 1e-9), 1.0
+            )
+
+        # Contacts, between the last free fraction and the touching one
+        envs = np.flatnonzero(impact < 1)
+        free, t, length = free[envs], t[envs], length[envs]
+        while True:
+            searching = (t - free) * length > self.precision
+            if not searching.any():
+                break
+
+            middle = (free + t) / 2
+            clearance = self.get_clearance(
+                envs, x0[envs] + middle * dx[envs], y0[envs] + middle * dy[envs]
+            )
+            free = np.where(searching & (clearance > 0), middle, free)
+            t = np.where(searching & (clearance <= 0), middle, t)
+
+        impact[envs] = free
+
+        return impact
+
+    @staticmethod
+    def get_crossings(p: np.array, p0: np.array, d: np.array) -> np.array:
+        """Fractions of the way from `p0` along `d` where the next half is crossed
+        after `p` (1 if not moving)"""
+
+        crossings = np.ones(len(p))
+        np.divide(
+            np.floor(p + 0.5) + np.copysign(0.5, d) - p0, d, out=crossings, where=d != 0
+        )
+
+        return crossings
+
+    def observe(self) -> None:
+        """Fills the observations with the state and the readings of the probes"""
+
+        sensor = self.sensor
+        np.multiply(self.theta, sensor.n_headings / (2 * np.pi), out=self.angles)
+        np.rint(self.angles, out=self.angles)
+        headings = self.headings
+        np.copyto(headings, self.angles, casting="unsafe")
+        headings %= sensor.n_headings
+
+        # Flat indexes of the probe points, truncated to their pixels
+        indexes, columns = self.indexes, self.columns
+        probes, offsets = self.probes, self.offsets
+        for positions, sensor_offsets, out in (
+            (self.y, sensor.offsets_y, indexes),
+            (self.x, sensor.offsets_x, columns),
+        ):
+            np.copyto(probes, positions[:, None])
+            np.take(sensor_offsets, headings, axis=0, out=offsets, mode="clip")
+            probes += offsets
+            np.copyto(out, probes, casting="unsafe")
+        indexes *= self.stride
+        indexes += columns
+        np.copyto(columns, self.origins[:, None])
+        indexes += columns
+        touching = self.walls.take(indexes, out=self.touching, mode="clip")
+
+        np.any(touching[:, : sensor.n_points], axis=1, out=self.back)
+        np.any(touching[:, sensor.n_points :], axis=1, out=self.front)
+        observations = self.observations
+        observations[:, 0] = self.x
+        observations[:, 1] = self.y
+        observations[:, 2] = self.theta
+        observations[:, 3] = self.back
+        observations[:, 4] = self.front
+        observations[:, 5] = self.collided
@@ -0,0 +1,93 @@
+import os
+
+# Benchmarks always run headless
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import argparse
+import fnmatch
+import json
+import platform
+
+import numpy as np
+import pygame
+
+from benchmarks import BENCHMARKS, measure
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns the benchmarks slower than the baseline by more than `threshold`"""
+
+    slower = []
+    for name, stats in results.items():
+        if name in baseline:
+            change = stats["mean"] / baseline[name]["mean"] - 1
+            stats["change"] = change
+            if change > threshold:
+                slower.append(name)
+
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the simulation hot paths")
+    parser.add_argument(
+        "filter", nargs="*", default=["*"], help="benchmark name patterns"
+    )
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each")
+    parser.add_argument("--save", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="JSON file with baseline results")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="relative slow down to report"
+    )
+    parser.add_argument("--list", action="store_true", help="only list benchmarks")
+    args = parser.parse_args()
+
+    names = [
+        name
+        for name in BENCHMARKS
+        if any(fnmatch.fnmatch(name, pattern) for pattern in args.filter)
+    ]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    results = {}
+    print(f"{'benchmark':<70} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for name in names:
+        setup, params = BENCHMARKS[name]
+        stats = measure(setup(**params), args.min_time)
+        results[name] = stats
+        print(
+            f"{name:<70} {stats['ops_per_sec']:>12.1f}"
+            f" {stats['p50'] * 1e6:>10.2f} {stats['p99'] * 1e6:>10.2f}"
+        )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+        slower = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        for name, stats in results.items():
+            if "change" in stats:
+                mark = " (slower)" if name in slower else ""
+                print(f"{name:<70} {stats['change']:>+10.1%}{mark}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "pygame": pygame.version.ver,
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import itertools
+import time
+
+import numpy as np
+
+BENCHMARKS = {}  # Name -> function returning the callable to time
+
+
+def benchmark(name: str, **cases: list):
+    """Registers a benchmark for every combination of the `cases` values
+
+    The decorated function gets one value per case and returns the callable to time
+    """
+
+    def register(setup):
+        for values in itertools.product(*cases.values()):
+            params = dict(zip(cases, values))
+            label = ",".join(f"{k}={v}" for k, v in params.items())
+            BENCHMARKS[f"{name}[{label}]" if label else name] = (setup, params)
+        return setup
+
+    return register
+
+
+def measure(func, min_time: float = 0.2, min_samples: int = 5) -> dict:
+    """Times `func`, in batches sized so each sample takes about a millisecond"""
+
+    # Calibrate the batch size
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed > 1e-3 or batch >= 1 << 20:
+            break
+        batch *= 2
+
+    samples = []
+    total = 0
+    while total < min_time or len(samples) < min_samples:
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / batch)
+        total += elapsed
+
+    samples = np.array(samples)
+    return {
+        "ops_per_sec": float(1 / samples.mean()),
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p90": float(np.percentile(samples, 90)),
+        "p99": float(np.percentile(samples, 99)),
+        "samples": len(samples),
+        "batch": batch,
+    }
+
+
+from . import bench_house, bench_robot, bench_controller, bench_screen, bench_vector_env
@@ -0,0 +1,34 @@
+import itertools
+
+import numpy as np
+import pygame
+
+from constants import *
+from adts import Controller, VacuumRobot
+from . import benchmark
+
+
+@benchmark("Controller.get_controls", mode=["automatic", "manual", "planned"])
+def get_controls(mode):
+    controller = Controller(LINEAR_VELOCITY, ANGULAR_VELOCITY, mode, FREQUENCY)
+    robot = VacuumRobot(pygame.Surface((ROBOT_LENGTH, ROBOT_LENGTH)), 25, 480, 270)
+    controller.set_waypoints(np.array([[900.0, 100.0]]))  # Never reached
+
+    # Go through every state, holding each lidar reading for a few frames
+    keys = [False] * 512
+    keys[pygame.K_w] = True
+    readings = itertools.cycle(
+        [(b, f) for b in (True, False) for f in (True, False) for _ in range(8)]
+    )
+
+    def control():
+        back_lidar, front_lidar = next(readings)
+        controller.get_controls(keys, back_lidar, front_lidar, robot)
+
+    return control
+
+
+@benchmark("Controller.collide")
+def collide():
+    controller = Controller(LINEAR_VELOCITY, ANGULAR_VELOCITY, "automatic", FREQUENCY)
+    return controller.collide
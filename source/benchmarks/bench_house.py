@@ -0,0 +1,201 @@
+import itertools
+import os
+import tempfile
+
+import numpy as np
+import pygame
+
+from constants import *
+from adts import House, VacuumRobot, Lidar, Plan, get_dust_field, save_map, load_map
+from . import benchmark
+from .maps import make_walls, get_house
+
+SIZES = [(960, 540), (1920, 1080)]
+N_WALLS = [0, 8]
+
+
+def get_robots(house: House, n: int = 64) -> list:
+    """Robots at free spots of the house, with random headings"""
+
+    np.random.seed(1)
+    return [
+        VacuumRobot(
+            pygame.Surface((ROBOT_LENGTH, ROBOT_LENGTH)),
+            ROBOT_LENGTH // 2,
+            *house.get_free_spot(ROBOT_LENGTH // 2),
+            np.random.uniform(0, 2 * np.pi),
+        )
+        for _ in range(n)
+    ]
+
+
+@benchmark("House.__init__", size=SIZES, n_walls=N_WALLS)
+def house_init(size, n_walls):
+    walls = make_walls(*size, n_walls)
+    return lambda: House(*size, walls)
+
+
+@benchmark("load_map", size=SIZES + [(8192, 8192)], n_walls=N_WALLS[-1:])
+def map_load(size, n_walls):
+    x, y = make_walls(*size, n_walls).T
+    walls = np.full(size[::-1], False)
+    walls[y, x] = True
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.map")
+    save_map(path, walls)
+    return lambda: load_map(path)
+
+
+@benchmark("House.get_surrounding_rectangle", size=SIZES, n_walls=N_WALLS)
+def get_surrounding_rectangle(size, n_walls):
+    return get_house(size, n_walls).get_surrounding_rectangle
+
+
+@benchmark("House.is_inside_house", size=SIZES, n_walls=N_WALLS)
+def is_inside_house(size, n_walls):
+    house = get_house(size, n_walls)
+    rng = np.random.default_rng(0)
+    points = itertools.cycle(
+        zip(rng.integers(0, size[0], 1024).tolist(), rng.integers(0, size[1], 1024))
+    )
+    return lambda: house.is_inside_house(*next(points))
+
+
+@benchmark("House.get_free_spot", size=SIZES, n_walls=N_WALLS, n_dust=[100, 10000])
+def get_free_spot(size, n_walls, n_dust):
+    house = get_house(size, n_walls, n_dust)
+    return lambda: house.get_free_spot(ROBOT_LENGTH // 2)
+
+
+@benchmark("House.is_following_wall", size=SIZES, n_walls=N_WALLS)
+def is_following_wall(size, n_walls):
+    house = get_house(size, n_walls)
+    robots = itertools.cycle(get_robots(house))
+
+    def follow():
+        robot = next(robots)
+        house.is_following_wall(robot, "back")
+        house.is_following_wall(robot, "front")
+
+    return follow
+
+
+@benchmark("House.get_wall_readings", size=SIZES, n_walls=N_WALLS)
+def get_wall_readings(size, n_walls):
+    house = get_house(size, n_walls)
+    robots = itertools.cycle(get_robots(house))
+    return lambda: house.get_wall_readings(next(robots))
+
+
+@benchmark("House.get_lidar_ranges", size=SIZES, n_walls=N_WALLS, n_beams=[90, 360])
+def get_lidar_ranges(size, n_walls, n_beams):
+    house = get_house(size, n_walls)
+    robots = get_robots(house)
+    for robot in robots:
+        robot.lidar = Lidar(n_beams)
+    robots = itertools.cycle(robots)
+    return lambda: house.get_lidar_ranges(next(robots))
+
+
+@benchmark("House.is_colliding", size=SIZES, n_walls=N_WALLS)
+def is_colliding(size, n_walls):
+    house = get_house(size, n_walls)
+    robots = itertools.cycle(get_robots(house))
+    return lambda: house.is_colliding(next(robots))
+
+
+@benchmark("House.get_impact", n_walls=N_WALLS, step=[1, 10, 100])
+def get_impact(n_walls, step):
+    house = get_house(SIZES[0], n_walls)
+    robots = itertools.cycle(get_robots(house))
+
+    def sweep():
+        x, y, theta = next(robots).state
+        house.get_impact(
+            x, y, x + step * np.cos(theta), y - step * np.sin(theta), ROBOT_LENGTH / 2
+        )
+
+    return sweep
+
+
+@benchmark("House.cover", size=SIZES, n_walls=N_WALLS)
+def cover(size, n_walls):
+    house = get_house(size, n_walls)
+    robots = itertools.cycle(get_robots(house))
+    step = LINEAR_VELOCITY / FREQUENCY
+
+    def sweep():
+        x, y, theta = next(robots).state
+        house.cover(
+            x, y, x + step * np.cos(theta), y - step * np.sin(theta), ROBOT_LENGTH / 2
+        )
+
+    return sweep
+
+
+@benchmark("Plan.__init__", size=SIZES, n_walls=N_WALLS)
+def plan_init(size, n_walls):
+    house = get_house(size, n_walls)
+    return lambda: Plan(house, ROBOT_LENGTH / 2, 0.9 * ROBOT_LENGTH)
+
+
+@benchmark("get_dust_field", size=SIZES, n_walls=N_WALLS)
+def dust_field_init(size, n_walls):
+    house = get_house(size, n_walls, N_DUST)
+    return lambda: get_dust_field(
+        house, ROBOT_LENGTH // 2, ROBOT_LENGTH, (DUST_WIDTH, DUST_HEIGHT)
+    )
+
+
+@benchmark("DustField.update", size=SIZES, n_walls=N_WALLS)
+def dust_field_update(size, n_walls):
+    """Removing a dust spot and finding the distances again"""
+
+    house = get_house(size, n_walls, N_DUST)
+    field = get_dust_field(
+        house, ROBOT_LENGTH // 2, ROBOT_LENGTH, (DUST_WIDTH, DUST_HEIGHT)
+    )
+    counts, distance = field.counts.copy(), field.distance.copy()
+    spots = list(house.dust)
+    i = 0
+
+    def update():
+        nonlocal i
+        if i == len(spots):
+            np.copyto(field.counts, counts)
+            np.copyto(field.distance, distance)
+            i = 0
+
+        field.remove(*spots[i])
+        while not field.update(8):
+            pass
+        i += 1
+
+    return update
+
+
+@benchmark("DustField.get_waypoints", size=SIZES, n_walls=N_WALLS)
+def dust_field_waypoints(size, n_walls):
+    house = get_house(size, n_walls, N_DUST)
+    field = get_dust_field(
+        house, ROBOT_LENGTH // 2, ROBOT_LENGTH, (DUST_WIDTH, DUST_HEIGHT)
+    )
+    robots = itertools.cycle(get_robots(house))
+
+    def waypoints():
+        robot = next(robots)
+        field.get_waypoints(robot.pose.x, robot.pose.y)
+
+    return waypoints
+
+
+@benchmark("DustMap.find", n_dust=[100, 10000])
+def dust_find(n_dust):
+    house = get_house(SIZES[0], N_WALLS[-1], n_dust)
+    robots = itertools.cycle(get_robots(house))
+
+    def find():
+        rect = next(robots).get_rect()
+        house.dust.find(rect.left, rect.top, rect.right, rect.bottom)
+
+    return find
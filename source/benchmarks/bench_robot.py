@@ -0,0 +1,22 @@
+import numpy as np
+import pygame
+
+from constants import *
+from adts import VacuumRobot
+from . import benchmark
+
+
+@benchmark("VacuumRobot.move", action=["walking", "turning"])
+def move(action):
+    robot = VacuumRobot(pygame.Surface((ROBOT_LENGTH, ROBOT_LENGTH)), 25, 480, 270)
+    if action == "walking":
+        controls = np.array([LINEAR_VELOCITY, 0])
+    else:
+        controls = np.array([LINEAR_VELOCITY, ANGULAR_VELOCITY])
+    return lambda: robot.move(controls, 1 / FREQUENCY)
+
+
+@benchmark("VacuumRobot.get_state")
+def get_state():
+    robot = VacuumRobot(pygame.Surface((ROBOT_LENGTH, ROBOT_LENGTH)), 25, 480, 270)
+    return robot.get_state
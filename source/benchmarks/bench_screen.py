@@ -0,0 +1,67 @@
+import itertools
+
+import numpy as np
+
+from constants import *
+from graphics import *
+from utils import draw_screen
+from adts import Simulation, Renderer, Hud, Dust
+from . import benchmark
+from .maps import get_house
+
+SIZE = (WIDTH, HEIGHT)
+
+
+def get_simulation(n_walls: int, n_dust: int) -> Simulation:
+    """Simulation in a benchmark house"""
+
+    house = get_house(SIZE, n_walls)
+    house.reset_dust()
+    np.random.seed(0)
+
+    return Simulation(
+        house,
+        "automatic",
+        n_dust,
+        ROBOT_LENGTH,
+        (DUST_WIDTH, DUST_HEIGHT),
+        LINEAR_VELOCITY,
+        ANGULAR_VELOCITY,
+        FREQUENCY,
+        get_image("robot.png"),
+    )
+
+
+@benchmark("Simulation.step", n_walls=[0, 8], n_dust=[100, 10000])
+def step(n_walls, n_dust):
+    simulation = get_simulation(n_walls, n_dust)
+    return simulation.step
+
+
+@benchmark("draw_screen", n_walls=[0, 8], n_dust=[100, 10000])
+def frame(n_walls, n_dust):
+    simulation = get_simulation(n_walls, n_dust)
+    house = simulation.house
+
+    dust_group = pygame.sprite.Group(
+        *(Dust(get_image("dust.png"), *d) for d in house.dust)
+    )
+
+    # Offscreen surface, so nothing is shown even with a real display
+    renderer = Renderer(pygame.Surface(SIZE), GREY, BROWN, house.walls, dust_group)
+    hud = Hud(get_font(), BLACK, 2)
+
+    # Frames of a moving robot with the time changing every second
+    states = itertools.cycle(
+        [
+            (SIZE[0] / 2 + 100 * np.cos(t), SIZE[1] / 2 + 100 * np.sin(t), t)
+            for t in np.linspace(0, 2 * np.pi, 120)
+        ]
+    )
+    times = itertools.count(0, 1 / FPS)
+
+    def draw():
+        simulation.robot.set_state(*next(states))
+        draw_screen(renderer, hud, simulation.robot, dust_group, next(times))
+
+    return draw
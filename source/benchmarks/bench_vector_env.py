@@ -0,0 +1,33 @@
+import numpy as np
+
+from constants import *
+from adts import VectorEnv
+from . import benchmark
+from .maps import get_house
+
+SIZE = (WIDTH, HEIGHT)
+
+
+@benchmark("VectorEnv.step", n_walls=[0, 8], n_envs=[1, 256, 1024])
+def step(n_walls, n_envs):
+    env = VectorEnv(
+        [get_house(SIZE, n_walls)] * n_envs,
+        N_DUST,
+        ROBOT_LENGTH,
+        (DUST_WIDTH, DUST_HEIGHT),
+        LINEAR_VELOCITY,
+        ANGULAR_VELOCITY,
+        FREQUENCY,
+    )
+    env.reset(seed=0)
+
+    # Walking while turning different amounts, so they collide now and then
+    rng = np.random.default_rng(0)
+    actions = np.column_stack(
+        (
+            np.full(n_envs, LINEAR_VELOCITY),
+            rng.uniform(-ANGULAR_VELOCITY, ANGULAR_VELOCITY, n_envs),
+        )
+    )
+
+    return lambda: env.step(actions)
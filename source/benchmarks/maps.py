@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+import numpy as np
+
+from constants import WALL_SIZE, DUST_WIDTH
+from adts import House
+
+
+def make_walls(width: int, height: int, n_walls: int, seed: int = 0) -> np.array:
+    """Walls (x, y) of a house filling the map, split by `n_walls` walls with doors"""
+
+    rng = np.random.default_rng(seed)
+    grid = np.full((height, width), False)
+    margin = 10
+
+    # Outside walls
+    grid[margin : margin + WALL_SIZE, margin:-margin] = True
+    grid[-margin - WALL_SIZE : -margin, margin:-margin] = True
+    grid[margin:-margin, margin : margin + WALL_SIZE] = True
+    grid[margin:-margin, -margin - WALL_SIZE : -margin] = True
+
+    # Inside walls, alternating vertical and horizontal, with a door in the middle
+    door = 80
+    for i in range(n_walls):
+        if i % 2 == 0:
+            x = rng.integers(2 * margin + door, width - 2 * margin - door)
+            y = rng.integers(margin, height - margin - door)
+            grid[margin:-margin, x : x + WALL_SIZE] = True
+            grid[y : y + door, x : x + WALL_SIZE] = False
+        else:
+            y = rng.integers(2 * margin + door, height - 2 * margin - door)
+            x = rng.integers(margin, width - margin - door)
+            grid[y : y + WALL_SIZE, margin:-margin] = True
+            grid[y : y + WALL_SIZE, x : x + door] = False
+
+    return np.argwhere(grid)[:, ::-1]
+
+
+@lru_cache(maxsize=None)
+def get_walls(size: tuple, n_walls: int) -> np.array:
+    """Walls of the benchmark houses (read-only, made once)"""
+
+    walls = make_walls(*size, n_walls)
+    walls.flags.writeable = False
+
+    return walls
+
+
+def get_house(size: tuple, n_walls: int, n_dust: int = 0) -> House:
+    """New house for a benchmark, with `n_dust` dust spread inside
+
+    Each benchmark changes its house (dust and coverage), so they aren't shared
+    """
+
+    house = House(*size, get_walls(size, n_walls))
+
+    np.random.seed(0)
+    for _ in range(n_dust):
+        house.dirty(*house.get_free_spot(DUST_WIDTH))
+
+    return house
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from constants import *
+from adts import House, Simulation, Trajectory, TrajectoryRecorder, load_tiles
+from adts.trajectory import STEP_DTYPE
+
+TRACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+
+# Recorded runs (name, parameters and steps) in the default map: the controller modes,
+# a frequency low enough for big steps and a longer rotation after collisions
+RUNS = [
+    ("automatic_240", {"mode": "automatic", "seed": 0, "frequency": 240}, 4800),
+    (
+        "automatic_30",
+        {"mode": "automatic", "seed": 1, "frequency": 30, "rotate_percent": 0.05},
+        1800,
+    ),
+    ("planned_240", {"mode": "planned", "seed": 0, "frequency": 240}, 4800),
+]
+DEFAULTS = {
+    "robot_length": ROBOT_LENGTH,
+    "n_dust": N_DUST,
+    "linear_velocity": float(LINEAR_VELOCITY),
+    "angular_velocity": float(ANGULAR_VELOCITY),
+    "rotate_percent": 0.01,
+}
+
+
+def simulate(house: House, params: dict, n_steps: int, path: str) -> None:
+    """Records up to `n_steps` steps (the initial state included) of a headless
+    simulation to `path`"""
+
+    house.reset_dust()
+    np.random.seed(params["seed"])
+
+    simulation = Simulation(
+        house,
+        params["mode"],
+        params["n_dust"],
+        params["robot_length"],
+        (DUST_WIDTH, DUST_HEIGHT),
+        params["linear_velocity"],
+        params["angular_velocity"],
+        params["frequency"],
+        rotate_percent=params["rotate_percent"],
+    )
+    simulation.recorder = TrajectoryRecorder(path, simulation, params)
+    simulation.run_until_clean(n_steps - 1)
+    simulation.recorder.close()
+
+
+def compare(expected: Trajectory, actual: Trajectory) -> str:
+    """Returns the first difference between the trajectories (`None` if the same)"""
+
+    if len(actual) != len(expected):
+        return f"{len(actual)} steps instead of {len(expected)}"
+
+    if not np.array_equal(actual.dust, expected.dust):
+        return "different dust spots"
+
+    different = actual.steps != expected.steps
+    if different.any():
+        step = int(np.argmax(different))
+        fields = [
+            name
+            for name in STEP_DTYPE.names
+            if actual.steps[name][step] != expected.steps[name][step]
+        ]
+        return f"step {step} differs in {', '.join(fields)}"
+
+    if not np.array_equal(actual.pickups, expected.pickups):
+        return "different dust pickups"
+
+    return None
+
+
+def record(traces: str) -> None:
+    """Records the runs again, after an intended change of the behaviour"""
+
+    walls, _ = load_tiles(DEFAULT_MAP)
+    house = House(walls.width, walls.height, walls)
+
+    os.makedirs(traces, exist_ok=True)
+    for name, params, n_steps in RUNS:
+        path = os.path.join(traces, name + ".traj")
+        simulate(house, {**DEFAULTS, **params}, n_steps, path)
+        print(f"{path}: {len(Trajectory(path))} steps", file=sys.stderr)
+
+
+def check(traces: str) -> bool:
+    """Simulates the recorded runs again, returns if all are the same"""
+
+    same = True
+    with tempfile.TemporaryDirectory() as directory:
+        for name in sorted(os.listdir(traces)):
+            if not name.endswith(".traj"):
+                continue
+
+            expected = Trajectory(os.path.join(traces, name))
+            house = House(expected.width, expected.height, expected.walls)
+            path = os.path.join(directory, name)
+            simulate(house, expected.header, len(expected), path)
+
+            difference = compare(expected, Trajectory(path))
+            print(f"{name}: {difference or 'same'}")
+            same &= difference is None
+
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks the simulation still does the same as in recorded runs"
+    )
+    parser.add_argument("--traces", default=TRACES, help="directory of the runs")
+    parser.add_argument(
+        "--record", action="store_true", help="record the runs again instead"
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.traces)
+    elif not check(args.traces):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
-import pygame
 import os
 import numpy as np
 
-pygame.init()
-
 ##### Hyperparameters #####
-FREQUENCY = 30  # Hz
+FREQUENCY = 240  # Hz, of the simulation steps (sensors, controller and motion)
+FPS = 30  # Frames drawn per second (at most)
+MAX_FRAME_TIME = (
+    0.25  # Seconds simulated at most per frame (slower frames slow it down)
+)
 N_DUST = 100  # number of dust
 LINEAR_VELOCITY = 200  # Pixel/s
 ANGULAR_VELOCITY = np.pi  # Rad/s
@@ -15,28 +16,8 @@ WIDTH, HEIGHT = 960, 540  # Pixels
 ROBOT_LENGTH = 50  # Pixels
 DUST_WIDTH, DUST_HEIGHT = 18, 12  # Pixels
 WALL_SIZE = 3  # Pixels
-DEFAULT_WALLS = np.load(os.path.join("assets", "default_walls.npy"))
-
-##### Main screen #####
-SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vacuum Robot Simulator")
-
-##### Images #####
-ROBOT_IMAGE = pygame.transform.scale(
-    pygame.image.load(os.path.join("assets", "robot.png")), (ROBOT_LENGTH, ROBOT_LENGTH)
-)
-DUST_IMAGE = pygame.transform.scale(
-    pygame.image.load(os.path.join("assets", "dust.png")), (DUST_WIDTH, DUST_HEIGHT)
-)
-
-##### Sounds #####
-COLLISION_SOUND = pygame.mixer.Sound(os.path.join("assets", "collision.wav"))
-COLLISION_SOUND.set_volume(0.1)
-VACUUM_SOUND = pygame.mixer.Sound(os.path.join("assets", "vacuum.wav"))
-VACUUM_SOUND.set_volume(0.05)
-
-##### Text Fonts #####
-TEXT_FONT = pygame.font.SysFont("comicsans", 40)
+SMOOTH_ROTATION = False  # Antialiased robot rotation
+DEFAULT_MAP = os.path.join("assets", "default.map")
 
 ##### Colors #####
 GREY = (220, 220, 220)
@@ -45,3 +26,4 @@ BROWN = (174, 71, 40)
 BLUE = (65, 105, 225)
 LIGHT_BLUE = (171, 219, 227)
 PY_GREEN = (170, 238, 187)
+RED = (220, 20, 60)
@@ -0,0 +1,62 @@
+import pygame
+import os
+from functools import lru_cache
+
+from constants import *
+
+# The mixer (the slowest to start) is only initialized when a sound is needed
+pygame.display.init()
+pygame.font.init()
+
+##### Main screen #####
+SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
+pygame.display.set_caption("Vacuum Robot Simulator")
+
+##### Images #####
+IMAGE_SIZES = {
+    "robot.png": (ROBOT_LENGTH, ROBOT_LENGTH),
+    "dust.png": (DUST_WIDTH, DUST_HEIGHT),
+}
+
+
+@lru_cache(maxsize=None)
+def load_image(name: str) -> pygame.Surface:
+    """Loads an image of the assets, only once"""
+
+    return pygame.image.load(os.path.join("assets", name))
+
+
+@lru_cache(maxsize=None)
+def get_image(name: str, size: tuple = None) -> pygame.Surface:
+    """Returns an image of the assets scaled to `size` (its default size if not
+    given), loaded on first use"""
+
+    return pygame.transform.scale(load_image(name), size or IMAGE_SIZES[name])
+
+
+##### Sounds #####
+SOUND_VOLUMES = {"collision.wav": 0.1, "vacuum.wav": 0.05}
+
+
+@lru_cache(maxsize=None)
+def get_sound(name: str) -> pygame.mixer.Sound:
+    """Returns a sound of the assets, loaded (and the mixer initialized) on first use"""
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+
+    sound = pygame.mixer.Sound(os.path.join("assets", name))
+    sound.set_volume(SOUND_VOLUMES[name])
+
+    return sound
+
+
+##### Text Fonts #####
+TEXT_SIZE = 40
+
+
+@lru_cache(maxsize=None)
+def get_font(size: int = TEXT_SIZE, bold: bool = False) -> pygame.font.Font:
+    """Returns the text font with that size, shared by everything that uses it"""
+
+    return pygame.font.SysFont("comicsans", size, bold=bold)
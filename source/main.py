@@ -1,114 +1,271 @@
+import argparse
+import os
+
 import pygame
-import time
 
 from adts import *
 from constants import *
+from graphics import *
 from utils import *
 
 
-def main():
+def main(args: argparse.Namespace):
 
     ##### Loading game ###
-    show_loading_screen()
+    if not args.fast_start:
+        show_loading_screen()
     mode = choose_game_mode()
-    walls = draw_walls(WALL_SIZE)
 
     ##### Init game state #####
-    house = House(WIDTH, HEIGHT, walls)
+    # Saved maps can be bigger than the screen, which then follows the robot
+    if args.map is not None:
+        walls, _ = load_tiles(args.map)
+        house = House(walls.width, walls.height, walls)
+        map_name = args.map
+    else:
+        house = House(WIDTH, HEIGHT, draw_walls(WALL_SIZE))
+        map_name = "drawn"
 
-    if not are_walls_valid(house):
-        house = House(WIDTH, HEIGHT, DEFAULT_WALLS)
-        walls = DEFAULT_WALLS
+    if not are_walls_valid(house, ROBOT_LENGTH / 2):
+        house = House(WIDTH, HEIGHT, load_tiles(DEFAULT_MAP)[0])
+        map_name = "default"
+    elif map_name == "drawn" and args.save_map is not None:
+        save_map(args.save_map, house.walls, {"wall_size": WALL_SIZE})
 
-    walls_group = pygame.sprite.Group()
-    for w in walls:
-        walls_group.add(Wall(BROWN, *w))
+    seed = np.random.randint(2**31) if args.seed is None else args.seed
+    np.random.seed(seed)
 
-    controller = Controller(LINEAR_VELOCITY, ANGULAR_VELOCITY, mode, FREQUENCY)
+    simulation = Simulation(
+        house,
+        mode,
+        N_DUST,
+        ROBOT_LENGTH,
+        (DUST_WIDTH, DUST_HEIGHT),
+        LINEAR_VELOCITY,
+        ANGULAR_VELOCITY,
+        FREQUENCY,
+        get_image("robot.png"),
+        SMOOTH_ROTATION,
+    )
 
-    # Get a valid starting position for the robot
-    while True:
-        robot_pos = house.get_free_spot()
-        robot = VacuumRobot(ROBOT_IMAGE, ROBOT_LENGTH // 2, *robot_pos)
-        if not pygame.sprite.spritecollideany(robot, walls_group):
-            break
+    # Dust sprites are only used for drawing
+    dust_sprites = {d: Dust(get_image("dust.png"), *d) for d in house.dust}
+    dust_group = pygame.sprite.Group(*dust_sprites.values())
 
-    dust_group = pygame.sprite.Group()
-    for _ in range(N_DUST):
-        while True:
-            d = house.get_free_spot()
-            dust = Dust(DUST_IMAGE, *d)
-            if not pygame.sprite.spritecollideany(dust, walls_group):
-                break
-        house.dirty(*d)
-        dust_group.add(dust)
+    renderer = Renderer(SCREEN, GREY, BROWN, house.walls, dust_group)
+    init_screen(renderer, simulation.robot, dust_group, not args.fast_start)
+
+    hud = Hud(get_font(), BLACK, 3)  # Cleaned percent, time and covered percent
 
-    init_screen(robot, walls_group, dust_group)
+    # Frame phases timing (recorded when saving it or showing the overlay)
+    profiler = FrameProfiler(enabled=args.profile is not None)
+    simulation.profiler = profiler
+    overlay = Hud(get_font(20), BLACK, 1 + len(Phase), (WIDTH - 200, 0))
+    show_overlay = False
+    show_heatmap = False
+
+    if args.record is not None:
+        simulation.recorder = TrajectoryRecorder(
+            args.record, simulation, {"seed": seed, "map": map_name}
+        )
 
     ##### Main game loop #####
+    # The simulation advances in fixed steps, as many per frame as the real time
+    # that passed, while the frames are drawn at FPS at most
     clock = pygame.time.Clock()
+    time_step = 1 / FREQUENCY
+    lag = 0.0  # Real seconds not simulated yet
+    n_frames = 0
     vacuum_sound_is_playing = False
-    start_time = time.time()
+    try:
+        while True:
+            profiler.start_frame()
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    show_overlay = not show_overlay
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    show_heatmap = not show_heatmap
+                    renderer.set_coverage(house.coverage if show_heatmap else None, RED)
+
+            profiler.lap(Phase.EVENTS)
+
+            # All cleaned
+            if simulation.is_clean():
+                if vacuum_sound_is_playing:
+                    get_sound("vacuum.wav").stop()
+                break
+
+            keys = pygame.key.get_pressed()
+            vacuuming = vacuum_sound_is_playing  # Unchanged if no step is done
+            while lag >= time_step and not simulation.is_clean():
+                vacuuming, collided = simulation.step(keys)
+                lag -= time_step
+
+                for d in simulation.vacuumed:
+                    dust = dust_sprites.pop(d)
+                    dust.kill()
+                    renderer.remove_dust(dust)
+
+                if collided and mode == "manual":
+                    get_sound("collision.wav").play()
+
+                profiler.lap(Phase.GAME)
+
+            # Vacuum sound management
+            if vacuuming and not vacuum_sound_is_playing:
+                get_sound("vacuum.wav").play(-1)
+                vacuum_sound_is_playing = True
+            elif not vacuuming and vacuum_sound_is_playing:
+                get_sound("vacuum.wav").stop()
+                vacuum_sound_is_playing = False
+
+            profiler.lap(Phase.GAME)
+
+            # Overlay and heatmap refreshed twice per second
+            n_frames += 1
+            if show_overlay and n_frames % (FPS // 2) == 0:
+                update_overlay(overlay, profiler)
+            if show_heatmap and n_frames % (FPS // 2) == 0:
+                renderer.refresh()
+
+            draw_screen(
+                renderer,
+                hud,
+                simulation.robot,
+                dust_group,
+                simulation.get_time(),
+                overlay if show_overlay else None,
+                house.get_coverage(),
+            )
+            profiler.lap(Phase.DRAW)
+
+            # Slower frames (over MAX_FRAME_TIME) slow the game down instead
+            lag = min(lag + clock.tick(FPS) / 1000, MAX_FRAME_TIME)
+            profiler.lap(Phase.TICK)
+
+            # Only changed between frames, so no phase is timed partially
+            profiler.enabled = show_overlay or args.profile is not None
+
+    finally:
+        if args.profile is not None:
+            profiler.dump(args.profile)
+        if simulation.recorder is not None:
+            simulation.recorder.close()
+
+    show_final_score(simulation.get_time())
+
+
+def replay(args: argparse.Namespace):
+    """Shows a recorded trajectory, without simulating it again
+
+    Space pauses, left and right arrows seek 5 seconds, up and down arrows change speed
+    """
+
+    trajectory = Trajectory(args.replay)
+    steps = trajectory.steps
+    frequency = trajectory.header["frequency"]
+    last = len(trajectory) - 1
+
+    dust_sprites = [
+        Dust(get_image("dust.png"), x, y) for x, y in trajectory.dust.tolist()
+    ]
+
+    robot = VacuumRobot(
+        get_image("robot.png"),
+        trajectory.header["radius"],
+        *steps[["x", "y", "theta"]][0].tolist(),
+        smooth_rotation=SMOOTH_ROTATION,
+    )
+    hud = Hud(get_font(), BLACK, 2)
+
+    position = 0.0  # Step shown, fractional for slow speeds
+    shown = None
+    speed = args.speed
+    paused = False
+
+    ##### Replay loop #####
+    clock = pygame.time.Clock()
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    position = max(position - 5 * frequency, 0)
+                elif event.key == pygame.K_RIGHT:
+                    position = min(position + 5 * frequency, last)
+                elif event.key == pygame.K_UP:
+                    speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    speed /= 2
 
-        # All cleaned
-        if not dust_group:
-            if vacuum_sound_is_playing:
-                VACUUM_SOUND.stop()
-            break
-
-        controls, vacuuming = controller.get_controls(
-            pygame.key.get_pressed(),
-            house.is_following_wall(robot, "back"),
-            house.is_following_wall(robot, "front"),
-            robot,
-        )
-
-        robot.move(controls, 1 / FREQUENCY)
+        step = int(position)
 
-        # Vacuum
-        if vacuuming:
-            for vacuumed in pygame.sprite.spritecollide(robot, dust_group, dokill=True):
-                house.clean(*vacuumed.get_pos())
+        # Seeking backwards brings dust back, so the screen is built again
+        if shown is None or step < shown:
+            remaining = trajectory.get_remaining_dust(step).nonzero()[0]
+            dust_group = pygame.sprite.Group(*(dust_sprites[i] for i in remaining))
+            renderer = Renderer(SCREEN, GREY, BROWN, trajectory.walls, dust_group)
+        else:
+            for i in trajectory.get_pickups(shown, step):
+                dust = dust_sprites[i]
+                dust.kill()
+                renderer.remove_dust(dust)
+        shown = step
 
-        walls_collided = pygame.sprite.spritecollide(robot, walls_group, dokill=False)
+        robot.set_state(*steps[["x", "y", "theta"]][step].tolist())
+        draw_screen(renderer, hud, robot, dust_group, step / frequency)
 
-        # Hit wall
-        if walls_collided:
+        clock.tick(FPS)
 
-            # Compensante for the robot being represented as a rectangle
-            for w in walls_collided:
-                if np.linalg.norm(w.pos - robot.get_state()[:2]) <= robot.get_radius():
-                    if mode == "manual":
-                        COLLISION_SOUND.play()
-                    controller.collide()
-                    robot.collided()
+        if not paused:
+            position = min(position + speed * frequency / FPS, last)
 
-                    break
-        # Left screen
-        elif not robot.get_rect() in SCREEN.get_rect():
-            if mode == "manual":
-                COLLISION_SOUND.play()
-            controller.collide()
-            robot.collided()
 
-        # Vacuum sound management
-        if vacuuming and not vacuum_sound_is_playing:
-            VACUUM_SOUND.play(-1)
-            vacuum_sound_is_playing = True
-        elif not vacuuming:
-            VACUUM_SOUND.stop()
-            vacuum_sound_is_playing = False
+def parse_args() -> argparse.Namespace:
+    """Parses the command line arguments"""
 
-        draw_screen(robot, walls_group, dust_group, start_time)
-        clock.tick(FREQUENCY)
+    parser = argparse.ArgumentParser(description="Vacuum robot simulator")
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="save the time of each frame phase to a .json or .csv file "
+        "(press F3 in game to show it)",
+    )
+    parser.add_argument("--map", help="play in a saved map instead of drawing one")
+    parser.add_argument("--save-map", metavar="MAP", help="save the drawn map")
+    parser.add_argument("--seed", type=int, help="seed of the robot and dust spots")
+    parser.add_argument(
+        "--record", metavar="TRAJECTORY", help="save every step to a trajectory file"
+    )
+    parser.add_argument(
+        "--replay", metavar="TRAJECTORY", help="show a recorded trajectory"
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="initial speed of the replay"
+    )
+    parser.add_argument(
+        "--fast-start",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("VACUUM_FAST_START", "").lower()
+        not in ("", "0", "false", "no"),
+        help="skip the loading screen and the dust animation "
+        "(the default is set by the VACUUM_FAST_START environment variable)",
+    )
 
-    show_final_score(start_time, time.time())
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.replay is not None:
+        replay(args)
+    else:
+        main(args)
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+from constants import *
+from adts import House, Simulation, TrajectoryRecorder, load_tiles
+
+# Parameters of a run, also the columns identifying it in the results
+PARAMETERS = [
+    "map",
+    "mode",
+    "seed",
+    "linear_velocity",
+    "angular_velocity",
+    "frequency",
+    "n_dust",
+    "rotate_percent",
+]
+RESULTS = ["clean", "steps", "time", "collisions", "cleaned", "coverage", "trajectory"]
+
+
+@lru_cache(maxsize=None)
+def load_house(map_path: str, width: int, height: int) -> House:
+    """Loads a house once per worker (`default` is the default map)"""
+
+    if map_path == "default":
+        map_path = DEFAULT_MAP
+
+    # Old maps are lists of the (x, y) coordinates of the walls, without a size
+    if map_path.endswith(".npy"):
+        return House(width, height, np.load(map_path))
+
+    walls, _ = load_tiles(map_path)
+    return House(walls.width, walls.height, walls)
+
+
+def run(
+    params: dict, width: int, height: int, max_time: float, record: str = None
+) -> dict:
+    """Runs one headless simulation and returns its results
+
+    With `record` (a directory) the run is also saved to a trajectory file
+    """
+
+    house = load_house(params["map"], width, height)
+    house.reset_dust()
+    np.random.seed(params["seed"])
+
+    simulation = Simulation(
+        house,
+        params["mode"],
+        params["n_dust"],
+        ROBOT_LENGTH,
+        (DUST_WIDTH, DUST_HEIGHT),
+        params["linear_velocity"],
+        params["angular_velocity"],
+        params["frequency"],
+        rotate_percent=params["rotate_percent"],
+    )
+
+    trajectory = ""
+    if record is not None:
+        map_name = os.path.splitext(os.path.basename(params["map"]))[0]
+        name = "_".join([map_name] + [str(params[p]) for p in PARAMETERS[1:]])
+        trajectory = os.path.join(record, name + ".traj")
+        simulation.recorder = TrajectoryRecorder(trajectory, simulation, params)
+
+    clean = simulation.run_until_clean(round(max_time * params["frequency"]))
+
+    if simulation.recorder is not None:
+        simulation.recorder.close()
+
+    return {
+        **params,
+        "clean": clean,
+        "steps": simulation.n_steps,
+        "time": round(simulation.get_time(), 6) if clean else "",
+        "collisions": simulation.n_collisions,
+        "cleaned": round(simulation.get_cleaned_percent(), 3),
+        "coverage": round(simulation.house.get_coverage(), 3),
+        "trajectory": trajectory,
+    }
+
+
+def get_key(row: dict) -> tuple:
+    """Identifies a run by its parameters"""
+
+    return tuple(str(row[p]) for p in PARAMETERS)
+
+
+def read_done(path: str) -> set:
+    """Returns the keys of the runs already in the results file"""
+
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = csv.DictReader(f)
+
+        return {get_key(row) for row in rows}
+
+
+def sweep(args: argparse.Namespace) -> None:
+    """Runs every combination of the parameters, appending results as they finish"""
+
+    grid = [
+        dict(zip(PARAMETERS, values))
+        for values in itertools.product(
+            args.maps,
+            args.modes,
+            args.seeds,
+            args.linear_velocity,
+            args.angular_velocity,
+            args.frequency,
+            args.n_dust,
+            args.rotate_percent,
+        )
+    ]
+
+    if args.record is not None:
+        os.makedirs(args.record, exist_ok=True)
+
+    done = read_done(args.output)
+    todo = [params for params in grid if get_key(params) not in done]
+    print(f"{len(grid)} runs, {len(grid) - len(todo)} already done", file=sys.stderr)
+
+    is_new = not os.path.exists(args.output) or not os.path.getsize(args.output)
+    with open(args.output, "a", newline="") as f:
+        if args.output.endswith(".jsonl"):
+
+            def write(row: dict) -> None:
+                f.write(json.dumps(row) + "\n")
+
+        else:
+            writer = csv.DictWriter(f, PARAMETERS + RESULTS)
+            if is_new:
+                writer.writeheader()
+            write = writer.writerow
+
+        with ProcessPoolExecutor(args.workers) as executor:
+            futures = {
+                executor.submit(
+                    run, params, args.width, args.height, args.max_time, args.record
+                ): params
+                for params in todo
+            }
+            failed = 0
+            try:
+                for n, future in enumerate(as_completed(futures), 1):
+                    # A failed run isn't saved, so resuming the sweep tries it again
+                    try:
+                        row = future.result()
+                    except Exception as error:
+                        failed += 1
+                        params = futures[future]
+                        print(
+                            f"[{n}/{len(todo)}] failed ({error!r}): "
+                            + ", ".join(f"{k}={params[k]}" for k in PARAMETERS),
+                            file=sys.stderr,
+                        )
+                        continue
+
+                    write(row)
+                    f.flush()
+                    print(
+                        f"[{n}/{len(todo)}] "
+                        + ", ".join(f"{k}={row[k]}" for k in PARAMETERS + RESULTS),
+                        file=sys.stderr,
+                    )
+
+            # Finished runs are saved, so the sweep can be resumed
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    if failed:
+        print(f"{failed} runs failed", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs headless simulations for every combination of parameters"
+    )
+    parser.add_argument("--maps", nargs="+", default=["default"])
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["automatic"],
+        choices=["automatic", "planned", "seek"],
+    )
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument(
+        "--linear-velocity", nargs="+", type=float, default=[float(LINEAR_VELOCITY)]
+    )
+    parser.add_argument(
+        "--angular-velocity", nargs="+", type=float, default=[float(ANGULAR_VELOCITY)]
+    )
+    parser.add_argument("--frequency", nargs="+", type=int, default=[FREQUENCY])
+    parser.add_argument("--n-dust", nargs="+", type=int, default=[N_DUST])
+    parser.add_argument("--rotate-percent", nargs="+", type=float, default=[0.01])
+    parser.add_argument(
+        "--width", type=int, default=WIDTH, help="house width of .npy maps"
+    )
+    parser.add_argument(
+        "--height", type=int, default=HEIGHT, help="house height of .npy maps"
+    )
+    parser.add_argument(
+        "--max-time", type=float, default=3600, help="simulated seconds per run"
+    )
+    parser.add_argument(
+        "--record", metavar="DIR", help="save the trajectory of each run to DIR"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--output", default="sweep.csv", help="results file (.csv or .jsonl)"
+    )
+
+    sweep(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,22 @@
+from functools import lru_cache
+
+import numpy as np
 import pygame
-import time
 
 from constants import *
-from adts import House, VacuumRobot, Button
+from graphics import *
+from adts import House, VacuumRobot, Button, Renderer, Hud, FrameProfiler, Phase
 
 
 def show_loading_screen():
-    """Show loading screen"""
+    """Show loading screen (pressing any key skips it)"""
 
-    font = pygame.font.SysFont("comicsans", 70, bold=True)
+    font = get_font(70, bold=True)
     text = font.render("Vacuum Robot Simulator", 1, BLACK)
     text_rect = text.get_rect()
     text_rect.center = (WIDTH // 2, HEIGHT // 3)
 
-    image = pygame.transform.scale(
-        pygame.image.load(os.path.join("assets", "robot.png")),
-        (text.get_width() // 3, text.get_width() // 3),
-    )
+    image = get_image("robot.png", (text.get_width() // 3, text.get_width() // 3))
     image_rect = image.get_rect()
     image_rect.center = (WIDTH // 2, 2 * HEIGHT // 3)
 
@@ -26,14 +26,14 @@ def show_loading_screen():
     SCREEN.blit(image, image_rect)
 
     pygame.display.update()
-    pygame.time.delay(2000)
+    wait(2000)
 
 
 def choose_game_mode():
     """Chooses the game mode to play"""
 
     automatic_button = Button(
-        TEXT_FONT,
+        get_font(),
         "Automatic Control",
         BLACK,
         BLUE,
@@ -45,7 +45,7 @@ def choose_game_mode():
     )
 
     manual_button = Button(
-        TEXT_FONT,
+        get_font(),
         "Manual Control",
         BLACK,
         BLUE,
@@ -57,9 +57,34 @@ def choose_game_mode():
         + 1.2 * automatic_button.get_height(),
     )
 
+    planned_button = Button(
+        get_font(),
+        "Planned Control",
+        BLACK,
+        BLUE,
+        LIGHT_BLUE,
+    )
+    planned_button.set_top_left_corner(
+        (WIDTH - planned_button.get_width()) // 2,
+        (HEIGHT - planned_button.get_height()) // 2
+        + 2.4 * automatic_button.get_height(),
+    )
+
+    seek_button = Button(
+        get_font(),
+        "Seek Control",
+        BLACK,
+        BLUE,
+        LIGHT_BLUE,
+    )
+    seek_button.set_top_left_corner(
+        (WIDTH - seek_button.get_width()) // 2,
+        (HEIGHT - seek_button.get_height()) // 2 + 3.6 * automatic_button.get_height(),
+    )
+
     SCREEN.fill(GREY)
     SCREEN.blit(
-        TEXT_FONT.render(
+        get_font().render(
             "Choose how to control the robot",
             1,
             BLACK,
@@ -78,14 +103,20 @@ def choose_game_mode():
 
         if left_click:
 
-            # Automatic control
-            if pos in automatic_button:
-
-                text = TEXT_FONT.render(
-                    "The robot will be automatically controlled",
-                    1,
-                    BLACK,
-                )
+            # Automatic control (reacting to the walls, following a plan or going
+            # to the closest dust)
+            if pos in automatic_button or pos in planned_button or pos in seek_button:
+                if pos in automatic_button:
+                    mode = "automatic"
+                    text = "The robot will be automatically controlled"
+                elif pos in planned_button:
+                    mode = "planned"
+                    text = "The robot will sweep the house following a plan"
+                else:
+                    mode = "seek"
+                    text = "The robot will go to the closest dust each time"
+
+                text = get_font().render(text, 1, BLACK)
 
                 SCREEN.fill(GREY)
                 SCREEN.blit(
@@ -96,7 +127,7 @@ def choose_game_mode():
                     ),
                 )
                 SCREEN.blit(
-                    TEXT_FONT.render(
+                    get_font().render(
                         "Click anywhere to continue",
                         1,
                         BLACK,
@@ -107,7 +138,7 @@ def choose_game_mode():
                 pygame.time.delay(200)
 
                 wait_for_click()
-                return "automatic"
+                return mode
 
             elif pos in manual_button:
 
@@ -121,7 +152,7 @@ def choose_game_mode():
                     "Enter - Stop robot",
                 ]
 
-                text = [TEXT_FONT.render(t, 1, BLACK) for t in text]
+                text = [get_font().render(t, 1, BLACK) for t in text]
 
                 SCREEN.fill(GREY)
 
@@ -143,7 +174,7 @@ def choose_game_mode():
                         offset += 1.1 * t.get_height()
 
                 SCREEN.blit(
-                    TEXT_FONT.render(
+                    get_font().render(
                         "Click anywhere to continue",
                         1,
                         BLACK,
@@ -158,15 +189,68 @@ def choose_game_mode():
 
         automatic_button.draw(SCREEN, pos)
         manual_button.draw(SCREEN, pos)
+        planned_button.draw(SCREEN, pos)
+        seek_button.draw(SCREEN, pos)
         pygame.display.update()
 
 
+@lru_cache(maxsize=None)
+def get_brush(size: int) -> tuple:
+    """Offsets (x, y) from the mouse of the pixels a brush of `size` paints"""
+
+    offsets = np.arange(-size // 2, size // 2 + 1)
+    mask = np.ones((len(offsets), len(offsets)), dtype=bool)  # Square brush
+    ys, xs = np.nonzero(mask)
+
+    return offsets[xs], offsets[ys]
+
+
+def paint_stroke(
+    walls: np.array, start: tuple, end: tuple, size: int, color: tuple
+) -> pygame.Rect:
+    """Paints the walls with the brush at every pixel from `start` to `end` (mouse
+    positions), in the grid and the screen, returns the region of the screen changed
+    (`None` if none)"""
+
+    height, width = walls.shape
+    brush_x, brush_y = get_brush(size)
+
+    # Every pixel of the way, so fast strokes don't leave gaps
+    n = max(abs(end[0] - start[0]), abs(end[1] - start[1])) + 1
+    xs = (
+        np.rint(np.linspace(start[0], end[0], n)).astype(int)[:, None] + brush_x
+    ).ravel()
+    ys = (
+        np.rint(np.linspace(start[1], end[1], n)).astype(int)[:, None] + brush_y
+    ).ravel()
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    xs, ys = xs[inside], ys[inside]
+    if not len(xs):
+        return None
+
+    left, top = xs.min(), ys.min()
+    right, bottom = xs.max() + 1, ys.max() + 1
+    stroke = np.zeros((bottom - top, right - left), dtype=bool)
+    stroke[ys - top, xs - left] = True
+
+    # Only the pixels that weren't walls yet
+    region = walls[top:bottom, left:right]
+    stroke &= ~region
+    region |= stroke
+
+    pixels = pygame.surfarray.pixels3d(SCREEN)  # Indexed by (x, y)
+    pixels[left:right, top:bottom][stroke.T] = color
+    del pixels  # Unlocks the screen
+
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
 def draw_walls(size):
-    """Lets the player draw the walls"""
+    """Lets the player draw the walls, returns the grid of the walls drawn"""
 
-    start_button = Button(TEXT_FONT, "Start Game", BLACK, BLUE, LIGHT_BLUE, (5, 5))
+    start_button = Button(get_font(), "Start Game", BLACK, BLUE, LIGHT_BLUE, (5, 5))
 
-    instruction_text = TEXT_FONT.render(
+    instruction_text = get_font().render(
         "Draw the house walls (or don't, to use the default)", 1, BLACK
     )
 
@@ -178,95 +262,118 @@ def draw_walls(size):
             5 + start_button.get_text_height() * start_button.get_border() / 2,
         ),
     )
+    start_button.draw(SCREEN, pygame.mouse.get_pos())
+    pygame.display.update()
 
-    walls = set()
+    # Strokes go from the last mouse position (None while not drawing) to each new one
+    walls = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    last = None
     while True:
-        for event in pygame.event.get():
+        # Sleeps until there are events
+        changed = [start_button.get_rect()]
+        for event in [pygame.event.wait()] + pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
 
-        left_click = pygame.mouse.get_pressed()[0]
-        pos = pygame.mouse.get_pos()
-
-        if left_click:
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                last = None
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                last = event.pos
+            elif not (
+                event.type == pygame.MOUSEMOTION
+                and event.buttons[0]
+                and last is not None
+            ):
+                continue
 
             # Start game
-            if pos in start_button:
+            if event.pos in start_button:
                 return walls
 
             # Draw wall
-            else:
-                for x in range(-size // 2, size // 2 + 1):
-                    for y in range(-size // 2, size // 2 + 1):
-                        cur = (min(pos[0] + x, WIDTH - 1), min(pos[1] + y, HEIGHT - 1))
-                        if cur not in walls:
-                            walls.add(cur)
-                            pygame.draw.line(SCREEN, BROWN, cur, cur)
-
-        start_button.draw(SCREEN, pos)
-        pygame.display.update()
+            changed.append(paint_stroke(walls, last, event.pos, size, BROWN))
+            last = event.pos
+
+        start_button.draw(SCREEN, pygame.mouse.get_pos())
+        pygame.display.update([rect for rect in changed if rect is not None])
 
 
 def init_screen(
+    renderer: Renderer,
     robot: VacuumRobot,
-    walls_group: pygame.sprite.Group,
     dust_group: pygame.sprite.Group,
+    animate: bool = True,
 ) -> None:
-    """Initializes the screen"""
+    """Initializes the screen, showing the dust one at a time if `animate` (until any
+    key is pressed)"""
 
-    SCREEN.fill(GREY)
+    renderer.follow(robot)
+    left, top = renderer.get_camera()
 
-    walls_group.draw(SCREEN)
+    SCREEN.blit(renderer.background, (0, 0))
 
-    pygame.display.update()
-    pygame.time.delay(100)
+    if animate:
+        pygame.display.update()
+        animate = not wait(100)
 
     # Draw dust
     for d in dust_group:
-        d.draw(SCREEN)
-        pygame.display.update()
-        pygame.time.delay(10)
+        rect = d.rect.move(-left, -top)
+        if SCREEN.get_rect().colliderect(rect):
+            SCREEN.blit(d.image, rect)
+            if animate:
+                pygame.display.update()
+                animate = not wait(10)
 
-    robot.draw(SCREEN)
+    robot.draw(SCREEN, (left, top))
 
     pygame.display.update()
-    pygame.time.delay(500)
+    if animate:
+        wait(500)
 
 
 def draw_screen(
+    renderer: Renderer,
+    hud: Hud,
     robot: VacuumRobot,
-    walls_group: pygame.sprite.Group,
     dust_group: pygame.sprite.Group,
-    start_time,
+    elapsed: float,
+    overlay: Hud = None,
+    covered: float = None,
 ) -> None:
     """Draws the general game screen"""
 
-    # Text
-    cleaned_text = TEXT_FONT.render(
-        f"Cleaned: {int(100*(N_DUST-len(dust_group))/N_DUST)}%", 1, BLACK
-    )
-    seconds = round(time.time() - start_time)
-    time_text = TEXT_FONT.render(f"Time: {seconds//60}min{seconds%60}s", 1, BLACK)
+    # Text (only rendered again when it changes)
+    hud.set_line(0, f"Cleaned: {int(100*(N_DUST-len(dust_group))/N_DUST)}%")
+    seconds = round(elapsed)
+    hud.set_line(1, f"Time: {seconds//60}min{seconds%60}s")
+    if covered is not None:
+        hud.set_line(2, f"Covered: {int(covered)}%")
 
-    SCREEN.fill(GREY)  # Background
+    texts = hud.get_texts()
+    if overlay is not None:
+        texts = texts + overlay.get_texts()
 
-    SCREEN.blit(cleaned_text, (0, 0))  # Cleaned percent text
-    SCREEN.blit(time_text, (0, cleaned_text.get_height()))  # Cleaned time text
+    renderer.draw(robot, texts)
 
-    walls_group.draw(SCREEN)
-    dust_group.draw(SCREEN)
-    robot.draw(SCREEN)
 
-    pygame.display.update()
+def update_overlay(overlay: Hud, profiler: FrameProfiler) -> None:
+    """Shows the frames per second and the time of each phase of the last second"""
+
+    fps, breakdown = profiler.get_breakdown(FPS)
+
+    overlay.set_line(0, f"FPS: {fps:.1f}")
+    for phase in Phase:
+        overlay.set_line(phase + 1, f"{phase.name.lower()}: {breakdown[phase]:.2f} ms")
 
 
-def show_final_score(start_time, final_time):
+def show_final_score(elapsed: float):
     """Shows the final score"""
 
-    font = pygame.font.SysFont("comicsans", 70)
+    font = get_font(70)
     message_text = font.render(f"All cleaned!", 1, BLACK)
-    seconds = round(final_time - start_time)
+    seconds = round(elapsed)
     time_text = font.render(f"Time: {seconds//60}min{seconds%60}s", 1, BLACK)
 
     SCREEN.fill(PY_GREEN)  # Background
@@ -287,7 +394,7 @@ def show_final_score(start_time, final_time):
     )  # Cleaned time text
 
     SCREEN.blit(
-        TEXT_FONT.render(
+        get_font().render(
             "Click anywhere to quit",
             1,
             BLACK,
@@ -299,25 +406,15 @@ def show_final_score(start_time, final_time):
     wait_for_click()
 
 
-def are_walls_valid(house: House, max_tries=1000) -> bool:
-    """Checks if the walls are valid"""
+def are_walls_valid(house: House, clearance: float = 0) -> bool:
+    """Checks if the walls are valid (there is free space inside the house)"""
 
-    min_x, max_x, min_y, max_y = house.get_surrounding_rectangle()
+    try:
+        house.get_free_spot(clearance)
+    except ValueError:
+        return False
 
-    tries = 0
-    while tries < max_tries:
-
-        x = np.random.randint(min_x + 1, max_x)
-        y = np.random.randint(min_y + 1, max_y)
-
-        # Generate a spot for robot without walls, dust and inside the house
-        if house.is_inside_house(x, y):
-
-            return True
-
-        tries += 1
-
-    return False
+    return True
 
 
 def wait_for_click() -> None:
@@ -332,3 +429,22 @@ def wait_for_click() -> None:
         if left_click:
             pygame.time.delay(100)
             return
+
+
+def wait(milliseconds: int) -> bool:
+    """Waits, unless the player presses a key (returns if it was pressed)"""
+
+    end = pygame.time.get_ticks() + milliseconds
+    while pygame.time.get_ticks() < end:
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                return True
+
+            # Left for the game loop
+            elif event.type == pygame.QUIT:
+                pygame.event.post(event)
+                return True
+
+        pygame.time.delay(min(10, max(end - pygame.time.get_ticks(), 0)))
+
+    return False